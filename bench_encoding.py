@@ -0,0 +1,136 @@
+"""
+Benchmark tool-output encodings (JSON vs header + rows).
+
+Reports prompt token counts and encoding time for real-sized payloads and, with
+--live, the end-to-end latency of a model call that answers a question over each
+encoding.
+
+Usage:
+    python bench_encoding.py                       # synthetic payloads
+    python bench_encoding.py --payload tasks.json  # a captured tool output
+    python bench_encoding.py --live                # also call the model (needs OPENAI_API_KEY)
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from modules.config import DEFAULT_MODEL
+from modules.utils.encoding import encode
+
+try:
+    import tiktoken
+    _encoder = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # tiktoken is optional, and its vocabulary download may not be reachable
+    _encoder = None
+
+
+def count_tokens(text):
+    if _encoder:
+        return len(_encoder.encode(text))
+    # Rough estimate when tiktoken is unavailable
+    return len(text) // 4
+
+
+FAMILY = ["Nguyễn", "Trần", "Lê", "Phạm", "Bùi", "Đỗ", "Hoàng", "Vũ"]
+MIDDLE = ["Văn", "Thị", "Tài", "Mạnh", "Đức", "Minh", "Thu"]
+GIVEN = ["Long", "Thắng", "Anh", "Hoa", "Dũng", "Linh", "Quân", "Trang"]
+STATUSES = ["In progress", "Testing", "Done"]
+CLIENTS = ["vpbank", "tpbank", "fecredit", "momo", "homecredit", "shinhan"]
+URIS = ["/api/ekyc/ocr", "/api/ekyc/face-match", "/api/ekyc/liveness", "/api/ekyc/nfc"]
+
+
+def _timestamp(days_ago):
+    moment = datetime(2025, 5, 30) - timedelta(days=days_ago, minutes=random.randint(0, 1440))
+    return moment.strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _person():
+    return f"{random.choice(FAMILY)} {random.choice(MIDDLE)} {random.choice(GIVEN)}"
+
+
+def synthetic_payloads(tasks=150, users=120, report_rows=600):
+    random.seed(7)
+    payloads = {}
+    payloads["fetch_notion_tasks"] = [{
+        "created_time": _timestamp(random.randint(0, 90)),
+        "last_edited_time": _timestamp(random.randint(0, 10)),
+        "is_active": random.random() < 0.4,
+        "title": f"Task {i}: cập nhật luồng {random.choice(URIS)} cho {random.choice(CLIENTS)}",
+        "url": f"https://www.notion.so/Task-{i}-{random.getrandbits(128):032x}",
+        "status": random.choice(STATUSES),
+        "assignee": [{
+            "name": _person(),
+            "email": f"user{random.randint(1, users)}@kalapa.vn",
+            "slack_id": f"U0{random.getrandbits(40):010X}"
+        } for _ in range(random.randint(1, 2))],
+    } for i in range(tasks)]
+    payloads["get_list_of_users"] = [{
+        "id": f"U0{random.getrandbits(40):010X}",
+        "name": f"user{i}",
+    } for i in range(users)]
+    payloads["get_request_report"] = {"data": [{
+        "date": (datetime(2025, 5, 1) + timedelta(days=i % 30)).strftime("%Y-%m-%d"),
+        "client": random.choice(CLIENTS),
+        "uri": random.choice(URIS),
+        "environment": "ekyc-api-prod",
+        "count": random.randint(0, 5000),
+    } for i in range(report_rows)]}
+    return payloads
+
+
+def measure_encoding(payload, fmt, repeat=50):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = encode(payload, fmt)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    return text, count_tokens(text), elapsed_ms
+
+
+def measure_live(text, question, model):
+    import openai
+    start = time.perf_counter()
+    response = openai.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": "Answer using only the tool output provided."},
+            {"role": "user", "content": f"Tool output:\n{text}\n\nQuestion: {question}"},
+        ],
+    )
+    return (time.perf_counter() - start) * 1000, response.usage.prompt_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload", help="JSON file with a captured tool output")
+    parser.add_argument("--formats", default="json,tsv,csv")
+    parser.add_argument("--live", action="store_true", help="Measure end-to-end model latency")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--question", default="How many rows are there, and which three appear most often?")
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload) as f:
+            payloads = {args.payload: json.load(f)}
+    else:
+        payloads = synthetic_payloads()
+
+    formats = args.formats.split(",")
+    print(f"Token counter: {'tiktoken o200k_base' if _encoder else 'len/4 estimate'}")
+    for name, payload in payloads.items():
+        print(f"\n== {name} ==")
+        baseline = None
+        for fmt in formats:
+            text, tokens, encode_ms = measure_encoding(payload, fmt)
+            baseline = baseline or tokens
+            line = f"{fmt:>5}: {tokens:>7} tokens ({tokens / baseline:6.1%} of {formats[0]}), {len(text):>7} chars, encode {encode_ms:6.2f} ms"
+            if args.live:
+                latency_ms, prompt_tokens = measure_live(text, args.question, args.model)
+                line += f", model {latency_ms:7.0f} ms ({prompt_tokens} prompt tokens)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
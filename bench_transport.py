@@ -0,0 +1,239 @@
+"""
+Benchmark Slack event ingress: HTTP (/slack/events) vs Socket Mode.
+
+Both transports drive the same kind of AsyncApp with a no-op message listener, so the
+numbers are the per-event cost of the transport and Bolt's request handling, from the
+moment Slack would send an event until it gets the acknowledgement:
+
+- http:            signed POST to a local uvicorn server running AsyncSlackRequestHandler,
+                   one new connection per event (as Slack delivers them)
+- http-keepalive:  the same over a reused connection (a lower bound for HTTP)
+- socket:          an envelope pushed over a WebSocket by a local Slack stand-in that also
+                   answers auth.test and apps.connections.open, timed until the ack arrives
+
+Usage:
+    python bench_transport.py
+    python bench_transport.py --events 2000 --transports socket,http
+"""
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import time
+import uuid
+
+import aiohttp
+import uvicorn
+from aiohttp import web
+from fastapi import FastAPI, Request
+from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_bolt.async_app import AsyncApp
+from slack_sdk.signature import SignatureVerifier
+from slack_sdk.web.async_client import AsyncWebClient
+
+SIGNING_SECRET = "bench-signing-secret"
+WARMUP_EVENTS = 20
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def event_payload(i):
+    return {
+        "token": "bench",
+        "team_id": "T0BENCH",
+        "api_app_id": "A0BENCH",
+        "type": "event_callback",
+        "event_id": f"Ev{i:08d}",
+        "event_time": int(time.time()),
+        "event": {
+            "type": "message",
+            "channel": "C0BENCH",
+            "channel_type": "channel",
+            "user": "U0BENCH",
+            "text": f"benchmark message {i}",
+            "ts": f"{time.time():.6f}",
+        },
+    }
+
+
+class SlackStandIn:
+    """
+    Minimal local stand-in for the Slack Web API and the Socket Mode WebSocket endpoint.
+    """
+
+    def __init__(self):
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}/api/"
+        self.connected = asyncio.Event()
+        self.acks = {}
+        self._ws = None
+        self._runner = None
+
+    async def start(self):
+        server = web.Application()
+        server.router.add_post("/api/auth.test", self.auth_test)
+        server.router.add_post("/api/apps.connections.open", self.connections_open)
+        server.router.add_get("/link", self.link)
+        self._runner = web.AppRunner(server)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def auth_test(self, request):
+        return web.json_response({"ok": True, "url": "https://bench.slack.com/", "team": "bench",
+                                  "team_id": "T0BENCH", "user": "bot", "user_id": "U0BOT", "bot_id": "B0BOT"})
+
+    async def connections_open(self, request):
+        return web.json_response({"ok": True, "url": f"ws://127.0.0.1:{self.port}/link"})
+
+    async def link(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"type": "hello", "num_connections": 1}))
+        self._ws = ws
+        self.connected.set()
+        async for message in ws:
+            envelope_id = json.loads(message.data).get("envelope_id")
+            if envelope_id in self.acks:
+                self.acks.pop(envelope_id).set_result(time.perf_counter())
+        self.connected.clear()
+        return ws
+
+    async def push(self, payload):
+        """Send one event envelope and return the seconds until it was acknowledged."""
+        envelope_id = str(uuid.uuid4())
+        acked = asyncio.get_running_loop().create_future()
+        self.acks[envelope_id] = acked
+        started = time.perf_counter()
+        await self._ws.send_str(json.dumps({
+            "envelope_id": envelope_id,
+            "type": "events_api",
+            "accepts_response_payload": False,
+            "retry_attempt": 0,
+            "payload": payload,
+        }))
+        return await acked - started
+
+
+def build_app(base_url):
+    """An AsyncApp like the production one, with a listener that only counts events."""
+    app = AsyncApp(client=AsyncWebClient(token="xoxb-bench", base_url=base_url), signing_secret=SIGNING_SECRET)
+    app.received = 0
+
+    @app.event("message")
+    async def count_message(event):
+        app.received += 1
+
+    return app
+
+
+async def bench_socket(standin, events):
+    app = build_app(standin.base_url)
+    handler = AsyncSocketModeHandler(app, "xapp-bench")
+    await handler.connect_async()
+    await asyncio.wait_for(standin.connected.wait(), timeout=10)
+
+    for i in range(WARMUP_EVENTS):
+        await standin.push(event_payload(i))
+    latencies = [await standin.push(event_payload(i)) for i in range(events)]
+
+    await handler.close_async()
+    return latencies, app
+
+
+async def bench_http(standin, events, keepalive):
+    app = build_app(standin.base_url)
+    handler = AsyncSlackRequestHandler(app)
+    api = FastAPI()
+
+    @api.post("/slack/events")
+    async def endpoint(req: Request):
+        return await handler.handle(req)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(api, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    verifier = SignatureVerifier(SIGNING_SECRET)
+    url = f"http://127.0.0.1:{port}/slack/events"
+
+    async def post(session, i):
+        body = json.dumps(event_payload(i))
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            "X-Slack-Request-Timestamp": timestamp,
+            "X-Slack-Signature": verifier.generate_signature(timestamp=timestamp, body=body),
+        }
+        started = time.perf_counter()
+        async with session.post(url, data=body, headers=headers) as response:
+            await response.read()
+            if response.status != 200:
+                raise RuntimeError(f"/slack/events answered {response.status}")
+        return time.perf_counter() - started
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=not keepalive)) as session:
+        for i in range(WARMUP_EVENTS):
+            await post(session, i)
+        latencies = [await post(session, i) for i in range(events)]
+
+    server.should_exit = True
+    await serving
+    return latencies, app
+
+
+def report(name, latencies, app, events):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>15}: p50 {statistics.median(latencies) * 1000:7.3f} ms | p95 {p95 * 1000:7.3f} ms | "
+        f"p99 {p99 * 1000:7.3f} ms | mean {statistics.mean(latencies) * 1000:7.3f} ms | "
+        f"listener ran {app.received}/{events + WARMUP_EVENTS}"
+    )
+    return statistics.median(latencies)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=500, help="Timed events per transport")
+    parser.add_argument("--transports", default="http,http-keepalive,socket", help="Comma-separated transports")
+    args = parser.parse_args()
+
+    standin = SlackStandIn()
+    await standin.start()
+    runs = {
+        "http": lambda: bench_http(standin, args.events, keepalive=False),
+        "http-keepalive": lambda: bench_http(standin, args.events, keepalive=True),
+        "socket": lambda: bench_socket(standin, args.events),
+    }
+
+    print(f"Time from event sent to ack received, {args.events} events per transport")
+    medians = {}
+    for name in args.transports.split(","):
+        latencies, app = await runs[name.strip()]()
+        # Listeners run after the ack; give the last ones a moment before counting
+        await asyncio.sleep(0.1)
+        medians[name.strip()] = report(name.strip(), latencies, app, args.events)
+    await standin.stop()
+
+    if "socket" in medians:
+        for name in ("http", "http-keepalive"):
+            if name in medians:
+                saved = (medians[name] - medians["socket"]) * 1000
+                print(f"Socket Mode vs {name}: {saved:+.3f} ms per event at p50 "
+                      f"({medians[name] / medians['socket']:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
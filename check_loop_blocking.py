@@ -0,0 +1,117 @@
+"""
+Regression check: handling a Slack message must not block the event loop.
+
+Runs main.handle_message on representative messages (DMs, channel messages, a repeated
+question, a digest-shaped question, a *REQUEST COUNTER* message and a burst of concurrent
+messages) with the real admission control, response cache, digests, conversation history
+and request counter ingest, and exits with status 1 if the loop monitor records a stall
+while any of them is handled.
+
+Model calls are replaced by a coroutine that waits like a slow model and replies are
+collected instead of posted, so the check runs offline (ASSISTANT_TYPE=agent). With --live
+the configured assistant answers for real. The check uses a fresh database in a temporary
+directory.
+
+Usage:
+    python check_loop_blocking.py
+    python check_loop_blocking.py --threshold 0.05
+    python check_loop_blocking.py --live
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import types
+
+COUNTER_CHANNEL = "C0COUNTER"
+
+MESSAGES = [
+    ("U0ALICE", "D0ALICE", "im", "Có bao nhiêu task đang in progress tuần này?"),
+    ("U0ALICE", "D0ALICE", "im", "Có bao nhiêu task đang in progress tuần này?"),
+    ("U0BOB", "C0GENERAL", "channel", "Số request hôm qua theo client là bao nhiêu?"),
+    ("U0BOB", "C0GENERAL", "channel", "Tổng số request của vpbank từ 01/05 đến 07/05"),
+    (None, COUNTER_CHANNEL, "channel",
+     "*REQUEST COUNTER* ekyc-api-prod\n• vpbank | /api/ekyc/ocr: 1,204\n• momo | /api/ekyc/liveness: 310"),
+]
+
+
+async def run_check(main, monitor, burst):
+    replies = []
+
+    async def say(**kwargs):
+        replies.append(kwargs)
+
+    failures = []
+    for i, (user_id, channel_id, channel_type, text) in enumerate(MESSAGES):
+        event = {"type": "message", "user": user_id, "channel": channel_id, "channel_type": channel_type,
+                 "text": text, "ts": f"{time.time():.6f}"}
+        with monitor.capture() as stalls:
+            await main.handle_message(event, say)
+            # A stall at the very end is only recorded on the next heartbeat
+            await asyncio.sleep(monitor.interval * 2)
+        print(f"{'FAIL' if stalls else 'ok':>4}  {text.splitlines()[0]!r:.70}")
+        failures += stalls
+
+    with monitor.capture() as stalls:
+        await asyncio.gather(*[
+            main.handle_message({"type": "message", "user": f"U0BURST{i}", "channel": "C0GENERAL",
+                                 "channel_type": "channel", "text": f"Task nào của user {i} đang testing?",
+                                 "ts": f"{time.time():.6f}"}, say)
+            for i in range(burst)
+        ])
+        await asyncio.sleep(monitor.interval * 2)
+    print(f"{'FAIL' if stalls else 'ok':>4}  burst of {burst} concurrent messages")
+    failures += stalls
+
+    print(f"{len(replies)} replies, max loop lag {monitor.max_lag * 1000:.1f} ms")
+    for stall in failures:
+        print(f"Event loop blocked for {stall['lag_ms']} ms by {stall['origin']}:")
+        for frame in stall["stack"]:
+            print(f"    {frame}")
+    return not failures
+
+
+async def main_async(args):
+    import main
+    from modules.utils.loop_monitor import LoopMonitor
+    from modules.utils.supervisor import supervisor
+
+    if not main.REQUEST_COUNTER_CHANNEL_ID:
+        main.REQUEST_COUNTER_CHANNEL_ID = COUNTER_CHANNEL
+    if not args.live:
+        if not hasattr(main.assistant, "run_tiered"):
+            sys.exit("The offline check needs ASSISTANT_TYPE=agent (or use --live)")
+
+        async def run_agent(agent, input, hooks=None, timeout=None):
+            await asyncio.sleep(args.model_latency)
+            supervisor.record("completed")
+            return "Đây là câu trả lời thử nghiệm.", types.SimpleNamespace(raw_responses=[])
+
+        supervisor.run_agent = run_agent
+
+    monitor = LoopMonitor(interval=args.threshold / 4, threshold=args.threshold)
+    monitor.start()
+    try:
+        return await run_check(main, monitor, args.burst)
+    finally:
+        monitor.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=0.1, help="Loop lag in seconds that counts as blocking")
+    parser.add_argument("--burst", type=int, default=10, help="Number of concurrent messages in the burst")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Seconds the offline model takes")
+    parser.add_argument("--live", action="store_true", help="Use the configured assistant instead of the offline model")
+    args = parser.parse_args()
+
+    # The conversation database path is relative; keep the check's data out of the real one
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="check_loop_blocking_"))
+    sys.exit(0 if asyncio.run(main_async(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Replay recorded conversations against model configurations of MyAgent.
+
+Each case is one user message from the conversation database with the conversation before
+it. Recording a case runs it once against the live tools with the configured models and
+stores every tool output (including get_today_date) and the answer, which becomes the
+reference. Evaluation replays the recorded tool outputs, so every configuration answers
+from the same data on the same "today", and runs are repeatable. The report shows latency,
+tokens, estimated cost, agreement with the reference answer and how many tool calls had no
+recorded output (a configuration asked for data the reference run did not).
+
+Usage:
+    python eval_models.py --export cases.jsonl          # take cases from the conversation database
+    python eval_models.py --record cases.jsonl          # record tool outputs and reference answers (live)
+    python eval_models.py --cases cases.jsonl           # evaluate the built-in configurations
+    python eval_models.py --cases cases.jsonl --configs configs.json
+
+configs.json maps a configuration name to MyAgent arguments, e.g.
+    {"mini-triage": {"models": {"triage": "gpt-4o-mini"}, "model_settings": {"triage": {"temperature": 0}}}}
+"""
+import argparse
+import asyncio
+import dataclasses
+import difflib
+import json
+import re
+import sqlite3
+import statistics
+import time
+from collections import defaultdict
+
+from agents import RunHooks
+
+from modules.agents import MyAgent
+from modules.config import DEFAULT_MODEL, AGENT_MODELS, AGENT_MODEL_SETTINGS, HISTORY_WINDOW
+from modules.utils.common import normalize_text
+from modules.utils.db_utils import DB_PATH
+
+# USD per 1M tokens: (input, cached input, output)
+PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+
+DEFAULT_CONFIGS = {
+    # Every agent on the default model with default settings (settings must be overridden
+    # explicitly, MyAgent merges them with AGENT_MODEL_SETTINGS)
+    "baseline": {
+        "models": {name: DEFAULT_MODEL for name in AGENT_MODELS},
+        "model_settings": {name: {} for name in AGENT_MODELS},
+    },
+    "configured": {"models": dict(AGENT_MODELS), "model_settings": dict(AGENT_MODEL_SETTINGS)},
+}
+
+
+class UsageHooks(RunHooks):
+    """Collects token usage per model across a run."""
+
+    def __init__(self):
+        self.usage = defaultdict(lambda: {"input": 0, "cached": 0, "output": 0})
+
+    async def on_llm_end(self, context, agent, response):
+        model = agent.model if isinstance(agent.model, str) else getattr(agent.model, "model", str(agent.model))
+        usage = self.usage[model]
+        usage["input"] += response.usage.input_tokens
+        usage["output"] += response.usage.output_tokens
+        details = getattr(response.usage, "input_tokens_details", None)
+        usage["cached"] += getattr(details, "cached_tokens", 0) or 0
+
+    def cost(self):
+        total = 0.0
+        for model, usage in self.usage.items():
+            price_in, price_cached, price_out = PRICES.get(model, PRICES[DEFAULT_MODEL])
+            total += ((usage["input"] - usage["cached"]) * price_in + usage["cached"] * price_cached
+                      + usage["output"] * price_out) / 1_000_000
+        return total
+
+
+class ToolTape:
+    """
+    Records the outputs of tool calls during a live run, or replays recorded outputs
+    instead of calling the tools.
+    """
+
+    def __init__(self):
+        self.outputs = {}
+        self.recording = True
+        self.misses = 0
+
+    def load(self, outputs=None):
+        """Start a case: record if `outputs` is None, otherwise replay them."""
+        self.recording = outputs is None
+        self.outputs = dict(outputs or {})
+        self.misses = 0
+
+    @staticmethod
+    def key(name, arguments):
+        try:
+            arguments = json.dumps(json.loads(arguments or "{}"), sort_keys=True, ensure_ascii=False)
+        except ValueError:
+            pass
+        return f"{name} {arguments}"
+
+    def install(self, agent):
+        """Route the tool calls of a MyAgent (all tiers) through the tape."""
+        seen = set()
+
+        def visit(a):
+            if a is None or id(a) in seen:
+                return
+            seen.add(id(a))
+            a.tools = [dataclasses.replace(t, on_invoke_tool=self.wrap(t)) for t in a.tools]
+            for handoff in a.handoffs:
+                visit(handoff)
+
+        visit(agent.agent)
+        visit(agent.fallback_agent)
+
+    def wrap(self, tool):
+        invoke_tool = tool.on_invoke_tool
+
+        async def invoke(context, arguments):
+            key = self.key(tool.name, arguments)
+            if self.recording:
+                output = await invoke_tool(context, arguments)
+                self.outputs[key] = output
+                return output
+            if key in self.outputs:
+                return self.outputs[key]
+            self.misses += 1
+            return json.dumps({"error": f"No recorded output for {tool.name} with these arguments"})
+
+        return invoke
+
+
+def export_cases(path, limit):
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(
+        "SELECT thread_key, role, content FROM thread_messages ORDER BY thread_key, timestamp, message_id"
+    ).fetchall()
+    conn.close()
+
+    cases, threads = [], defaultdict(list)
+    for row in rows:
+        threads[row["thread_key"]].append({"role": row["role"], "content": row["content"]})
+    for messages in threads.values():
+        for i in range(len(messages) - 1):
+            if messages[i]["role"].startswith("user") and messages[i + 1]["role"] == "assistant":
+                cases.append({
+                    "history": messages[max(0, i - HISTORY_WINDOW):i],
+                    "role": messages[i]["role"],
+                    "message": messages[i]["content"],
+                    "original_reply": messages[i + 1]["content"],
+                })
+    cases = cases[-limit:]
+    with open(path, "w") as f:
+        for case in cases:
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+    print(f"Exported {len(cases)} cases to {path}")
+
+
+def agreement(answer, reference):
+    """Text similarity of two answers and whether they contain the same numbers."""
+    a, b = normalize_text(answer or ""), normalize_text(reference or "")
+    numbers_a, numbers_b = (set(re.findall(r"\d[\d,.]*\d|\d", t.replace(",", ""))) for t in (a, b))
+    return difflib.SequenceMatcher(None, a, b).ratio(), numbers_a == numbers_b
+
+
+def case_input(case):
+    items = [MyAgent.to_input_item(m["role"], m["content"]) for m in case["history"]]
+    items.append(MyAgent.to_input_item(case["role"], case["message"]))
+    return items
+
+
+async def record_cases(path, limit):
+    with open(path) as f:
+        cases = [json.loads(line) for line in f if line.strip()][-limit:]
+    config = DEFAULT_CONFIGS["configured"]
+    agent = MyAgent(models=config["models"], model_settings=config["model_settings"])
+    tape = ToolTape()
+    tape.install(agent)
+
+    recorded = []
+    for case in cases:
+        tape.load()
+        try:
+            output, _ = await agent.run_tiered(case_input(case))
+        except Exception as e:
+            print(f"[record] error on {case['message']!r:.60}: {e}")
+            continue
+        if not MyAgent.is_valid_output(output):
+            print(f"[record] no valid answer for {case['message']!r:.60}, skipped")
+            continue
+        recorded.append({**case, "tool_outputs": tape.outputs, "reference": output})
+
+    with open(path, "w") as f:
+        for case in recorded:
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+    print(f"Recorded {len(recorded)} of {len(cases)} cases to {path}")
+
+
+async def evaluate(name, config, cases):
+    agent = MyAgent(models=config.get("models"), model_settings=config.get("model_settings"))
+    tape = ToolTape()
+    tape.install(agent)
+    results = []
+    for case in cases:
+        tape.load(case["tool_outputs"])
+        items = case_input(case)
+        hooks = UsageHooks()
+        started = time.perf_counter()
+        try:
+            output, _ = await agent.run_tiered(items, hooks=hooks)
+        except Exception as e:
+            output = None
+            print(f"[{name}] error on {case['message']!r:.60}: {e}")
+        latency = time.perf_counter() - started
+        similarity, same_numbers = agreement(output, case["reference"])
+        results.append({
+            "latency": latency,
+            "cost": hooks.cost(),
+            "tokens": sum(u["input"] + u["output"] for u in hooks.usage.values()),
+            "similarity": similarity,
+            "same_numbers": same_numbers,
+            "valid": MyAgent.is_valid_output(output),
+            "replay_misses": tape.misses,
+        })
+    return results
+
+
+def report(name, results):
+    latencies = sorted(r["latency"] for r in results)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{name:>14}: latency p50 {statistics.median(latencies):6.2f}s p95 {p95:6.2f}s | "
+        f"tokens/case {statistics.mean(r['tokens'] for r in results):8.0f} | "
+        f"cost ${sum(r['cost'] for r in results):.4f} | "
+        f"similarity {statistics.mean(r['similarity'] for r in results):.2f} | "
+        f"same numbers {sum(r['same_numbers'] for r in results) / len(results):.0%} | "
+        f"valid {sum(r['valid'] for r in results) / len(results):.0%} | "
+        f"unrecorded tool calls {sum(r['replay_misses'] for r in results)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", help="Write cases from the conversation database to this JSONL file and exit")
+    parser.add_argument("--record", help="Record tool outputs and reference answers for the cases in this JSONL file")
+    parser.add_argument("--cases", help="JSONL file with recorded cases")
+    parser.add_argument("--configs", help="JSON file with configurations to compare")
+    parser.add_argument("--limit", type=int, default=50, help="Number of most recent cases")
+    args = parser.parse_args()
+
+    if args.export:
+        export_cases(args.export, args.limit)
+        return
+    if args.record:
+        await record_cases(args.record, args.limit)
+        return
+    if not args.cases:
+        parser.error("--cases, --record or --export is required")
+
+    with open(args.cases) as f:
+        cases = [json.loads(line) for line in f if line.strip()][-args.limit:]
+    if not all("tool_outputs" in case for case in cases):
+        parser.error(f"{args.cases} has cases without recorded tool outputs; run --record first")
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs) as f:
+            configs = json.load(f)
+
+    print(f"Evaluating {len(configs)} configurations on {len(cases)} cases")
+    for name, config in configs.items():
+        report(name, await evaluate(name, config, cases))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
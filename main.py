@@ -1,17 +1,36 @@
 import openai
 import os
 import time
-import json
+import asyncio
+import hmac
+import threading
 import logging
 import openai
+from contextlib import asynccontextmanager
 
 from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
-from fastapi import FastAPI, Request
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from fastapi import FastAPI, Request, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from modules.utils.db_utils import update_thread_timestamp
-from modules.agents import create_assistant
-from modules.tools.slack_tool import app
+from modules.agents import create_assistant, NO_RESPONSE_TEXT
+from modules.tools.slack_tool import app, fetch_slack_directory
+from modules.tools.request_counter_tool import ingest_request_counter_messages, ingest_request_counter_event
+from modules.utils.request_counter import is_request_counter_message
+from modules.digests import run_digest_scheduler, answer_from_digest
+from modules.utils.response_cache import ResponseCache
+from modules.utils.data_versions import data_versions
+from modules.utils.loop_monitor import LoopMonitor, sample_profile
+from modules.utils.supervisor import supervisor
 from modules.utils.common import markdown_to_slack
-from modules.config import ASSISTANT_TYPE
+from modules.utils.admission import AdmissionController, AdmissionRejected
+from modules.config import (
+    ASSISTANT_TYPE, MAX_CONCURRENT_RUNS, MAX_QUEUE_DEPTH, MAX_QUEUED_PER_USER, ADMISSION_LANES,
+    IDENTITY_REFRESH_SECONDS, REQUEST_COUNTER_CHANNEL_ID, REQUEST_COUNTER_POLL_SECONDS,
+    RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_DISABLED_CHANNELS, RESPONSE_CACHE_REFRESH_SECONDS,
+    LOOP_MONITOR_INTERVAL_SECONDS, LOOP_LAG_THRESHOLD_SECONDS, PROFILE_MAX_SECONDS, DEBUG_API_TOKEN,
+    SLACK_TRANSPORT, SLACK_APP_TOKEN
+)
 
 # Configure logging
 logging.basicConfig(
@@ -19,13 +38,92 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-fastapi_app = FastAPI()
 handler = AsyncSlackRequestHandler(app)
 
+if SLACK_TRANSPORT not in ("http", "socket"):
+    raise ValueError(f"SLACK_TRANSPORT must be 'http' or 'socket', got {SLACK_TRANSPORT!r}")
+if SLACK_TRANSPORT == "socket" and not SLACK_APP_TOKEN:
+    raise ValueError("SLACK_TRANSPORT=socket needs SLACK_APP_TOKEN (an app-level xapp- token)")
+# In Socket Mode the same app handlers receive events over a WebSocket opened by us,
+# which acknowledges each event inline and reconnects on its own when the connection drops.
+# Created on startup, as its client needs the running event loop.
+socket_handler = None
+
 # Store Slack user-thread mapping (in-memory cache)
 user_threads = {}
 
 assistant = create_assistant(ASSISTANT_TYPE)
+admission = AdmissionController(
+    max_concurrent=MAX_CONCURRENT_RUNS,
+    max_queue_depth=MAX_QUEUE_DEPTH,
+    lanes=ADMISSION_LANES,
+    max_queued_per_user=MAX_QUEUED_PER_USER
+)
+response_cache = ResponseCache(
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    disabled_channels=RESPONSE_CACHE_DISABLED_CHANNELS
+)
+loop_monitor = LoopMonitor(
+    interval=LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=LOOP_LAG_THRESHOLD_SECONDS
+)
+profile_lock = asyncio.Lock()
+# Keep references to background jobs so they are not garbage collected
+background_tasks = []
+
+async def refresh_identity_index():
+    """Periodically refresh the Notion-to-Slack identity index from the Slack directory."""
+    while True:
+        try:
+            await fetch_slack_directory()
+        except Exception as e:
+            logging.error(f"Error refreshing identity index: {e}")
+        await asyncio.sleep(IDENTITY_REFRESH_SECONDS)
+
+async def tail_request_counter_channel():
+    """Periodically ingest new *REQUEST COUNTER* messages (catches anything missed while offline)."""
+    while True:
+        try:
+            await ingest_request_counter_messages(REQUEST_COUNTER_CHANNEL_ID)
+        except Exception as e:
+            logging.error(f"Error ingesting request counter messages: {e}")
+        await asyncio.sleep(REQUEST_COUNTER_POLL_SECONDS)
+
+async def refresh_cached_sources():
+    """Periodically re-read the data behind cached answers so stale answers are invalidated."""
+    while True:
+        await asyncio.sleep(RESPONSE_CACHE_REFRESH_SECONDS)
+        try:
+            await response_cache.refresh_sources()
+        except Exception as e:
+            logging.error(f"Error refreshing cached data sources: {e}")
+
+@asynccontextmanager
+async def lifespan(_):
+    """Start the background jobs (and the Socket Mode connection) with the server and stop them with it."""
+    global socket_handler
+    loop_monitor.start()
+    background_tasks.append(asyncio.create_task(refresh_identity_index()))
+    if REQUEST_COUNTER_CHANNEL_ID:
+        background_tasks.append(asyncio.create_task(tail_request_counter_channel()))
+    background_tasks.append(asyncio.create_task(run_digest_scheduler()))
+    background_tasks.append(asyncio.create_task(refresh_cached_sources()))
+    if SLACK_TRANSPORT == "socket":
+        socket_handler = AsyncSocketModeHandler(app, SLACK_APP_TOKEN)
+        await socket_handler.connect_async()
+        logging.info("Receiving Slack events over Socket Mode")
+
+    yield
+
+    if socket_handler:
+        await socket_handler.close_async()
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    loop_monitor.stop()
+
+fastapi_app = FastAPI(lifespan=lifespan)
 
 @app.event("message")
 async def handle_message(event, say):
@@ -33,13 +131,41 @@ async def handle_message(event, say):
     channel_id = event.get("channel")
     text = event.get("text")
 
+    if channel_id == REQUEST_COUNTER_CHANNEL_ID and is_request_counter_message(text):
+        ingest_request_counter_event(event)
+        return
+
     if not user_id or not text:
         return
 
     thread_key = f"{user_id}:{channel_id}"
     logging.info(f"Received message: {text} (Thread Key: {thread_key})")
-    
-    response_text = await assistant.take_order(text, thread_key)
+
+    # Cached and digest answers are cheap, so they do not wait for a run slot
+    response_text = response_cache.lookup(text, channel_id) or await answer_from_digest(text)
+    if response_text:
+        await assistant.remember(text, response_text, thread_key)
+    else:
+        lane = "dm" if event.get("channel_type") == "im" else "channel"
+        try:
+            ticket = admission.submit(user_id, lane)
+        except AdmissionRejected as e:
+            logging.warning(f"Rejected message from {thread_key}: {e}")
+            await say(text="Trợ lý đang quá tải, vui lòng thử lại sau ít phút.")
+            return
+
+        if ticket.position:
+            logging.info(f"Queued message from {thread_key} at position {ticket.position} ({admission.stats()})")
+            await say(text=f"Trợ lý đang bận, tin nhắn của bạn đang ở vị trí {ticket.position} trong hàng đợi.")
+
+        await admission.wait(ticket)
+        try:
+            with data_versions.track() as sources:
+                response_text = await assistant.take_order(text, thread_key)
+        finally:
+            admission.release()
+        if response_text != NO_RESPONSE_TEXT:
+            response_cache.store(text, channel_id, response_text, sources)
     await say(blocks=[
         {
             "type": "section",
@@ -59,4 +185,42 @@ async def handle_message(event, say):
 
 @fastapi_app.post("/slack/events")
 async def endpoint(req: Request):
-    return await handler.handle(req)
\ No newline at end of file
+    if SLACK_TRANSPORT == "socket":
+        # Events arrive over Socket Mode; do not accept a second copy over HTTP
+        raise HTTPException(status_code=404)
+    return await handler.handle(req)
+
+def check_debug_token(authorization):
+    """Allow /debug requests only with "Authorization: Bearer <DEBUG_API_TOKEN>"."""
+    if not DEBUG_API_TOKEN:
+        raise HTTPException(status_code=404)
+    if not authorization or not hmac.compare_digest(authorization, f"Bearer {DEBUG_API_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid debug token")
+
+@fastapi_app.get("/debug/loop")
+async def debug_loop(authorization: str = Header(None)):
+    """Event loop stalls (with the blocking stack) and run, cache and admission counters."""
+    check_debug_token(authorization)
+    return {
+        "loop": loop_monitor.stats(),
+        "runs": supervisor.stats(),
+        "response_cache": response_cache.stats(),
+        "admission": admission.stats(),
+        "transport": {
+            "mode": SLACK_TRANSPORT,
+            "connected": await socket_handler.client.is_connected() if socket_handler else None,
+        },
+    }
+
+@fastapi_app.get("/debug/profile")
+async def debug_profile(seconds: float = 10, loop_only: bool = False, authorization: str = Header(None)):
+    """Sample all threads (or only the event loop thread) for N seconds; returns collapsed stacks for flamegraphs."""
+    check_debug_token(authorization)
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS}")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        profile = await asyncio.to_thread(
+            sample_profile, seconds, loop_thread_only=loop_only, loop_thread_id=threading.get_ident())
+    return PlainTextResponse(profile)
\ No newline at end of file
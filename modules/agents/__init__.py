@@ -1,19 +1,33 @@
 from ..tools.notion_tool import fetch_notion_tasks, ft_fetch_notion_tasks
 from ..tools.slack_tool import fetch_channel_messages, get_list_of_channels, get_list_of_users
-from ..tools.slack_tool import ft_fetch_channel_messages, ft_get_list_of_channels, ft_get_list_of_users
+from ..tools.slack_tool import ft_fetch_channel_messages, ft_get_list_of_channels
 from ..tools.request_tool import get_request_report, ft_get_request_report, get_today_date, summation_tool, ft_get_today_date, ft_summation_tool
-from ..config import OPENAI_API_KEY, DEFAULT_MODEL
+from ..tools.request_counter_tool import query_request_counter, ft_query_request_counter
+from ..config import (
+    OPENAI_API_KEY, HISTORY_WINDOW, HISTORY_WINDOW_STEP,
+    AGENT_MODELS, AGENT_MODEL_SETTINGS, FALLBACK_MODEL
+)
+from ..utils.supervisor import supervisor, TERMINAL_RUN_STATUSES
+from ..utils.encoding import encode_tool_output
 from ..utils.db_utils import (
     init_db, load_threads_from_db, save_thread_to_db,
-    get_history_from_db, cleanup_old_threads, add_message_to_history
+    cleanup_old_threads, add_message_to_history,
+    get_stable_history_from_db, record_run_usage
 )
 import openai
 import json
 import time
+import asyncio
 import logging
-from agents import Agent, ModelSettings, Runner
+from agents import Agent, ModelSettings
+from agents.exceptions import AgentsException
 openai.api_key = OPENAI_API_KEY
 
+NO_RESPONSE_TEXT = "Không có phản hồi từ trợ lý."
+
+# Settings from AGENT_MODEL_SETTINGS["assistant"] that assistants.create accepts
+ASSISTANT_SETTINGS = ("temperature", "top_p", "response_format")
+
 
 class MyAssistant:
     """
@@ -50,6 +64,25 @@ class MyAssistant:
                     }
                 }
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "query_request_counter",
+                    "description": "Query request counts ingested from *REQUEST COUNTER* Slack messages, summed per group.\nArgs:\n    from_date (str): Start of the range, YYYY-MM-DD or YYYY-MM-DD HH:MM.\n    to_date (str): End of the range, YYYY-MM-DD (whole day included) or YYYY-MM-DD HH:MM.\n    environment (str): Optional environment filter, e.g. ekyc-api-prod.\n    client (str): Optional client filter.\n    uri (str): Optional URI filter.\n    group_by (str): Comma-separated fields to group by: environment, client, uri, day, hour.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "from_date": {"type": "string"},
+                            "to_date": {"type": "string"},
+                            "environment": {"type": "string"},
+                            "client": {"type": "string"},
+                            "uri": {"type": "string"},
+                            "group_by": {"type": "string"}
+                        },
+                        "required": ["from_date", "to_date"]
+                    }
+                }
+            },
             {
                 "type": "function",
                 "function": {
@@ -94,7 +127,7 @@ class MyAssistant:
                 "type": "function",
                 "function": {
                     "name": "fetch_notion_tasks",
-                    "description": "Fetch tasks from Notion",
+                    "description": "Fetch tasks from Notion. Each assignee includes its resolved Slack ID (`slack_id`, null if unknown).",
                     "parameters": {
                         "type": "object",
                         "properties": {},
@@ -138,9 +171,17 @@ class MyAssistant:
 
         # Create a new assistant
         logging.info("Creating a new assistant")
+        self.model = AGENT_MODELS["assistant"]
+        # Runs are created and polled from the event loop, so they go through the async client
+        self.client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+        settings = AGENT_MODEL_SETTINGS.get("assistant", {})
+        unsupported = sorted(set(settings) - set(ASSISTANT_SETTINGS))
+        if unsupported:
+            logging.warning(f"Ignoring model settings the Assistants API does not support: {unsupported}")
         self.assistant = openai.beta.assistants.create(
             name="Personal Slack AI Assistant",
-            model=DEFAULT_MODEL,
+            model=self.model,
+            **{key: settings[key] for key in ASSISTANT_SETTINGS if key in settings},
             instructions="""
             You are a helpful assistant that can:
             - analyze data and answer questions regarding number of requests that clients made in a specific range of time.
@@ -149,11 +190,9 @@ class MyAssistant:
             - If the question is about Request statistics:
                 + Do not give answer if the client's name or URI did not match exactly with what you found. In that case, show the user the ambiguity and ask them to provide more information.
                 + If you have to make a summation, use the summation tool. NEVER do the summation yourself.
+                + For request counts reported in the *REQUEST COUNTER* Slack messages (per environment, client, URI, day or hour), use query_request_counter instead of reading channel messages.
             - If the question is about Notion tasks:
-                + If the user explicitly requests to mention Slack users, find the correct Slack ID of the corresponding user in the Notion database and replace the assignees with Slack mention <@USER_ID>.
-                + You can map the Slack user to the Notion user using either the name or email field:
-                    - Using name: Thang Bui Manh (name in Notion) -> thang b m -> thangbm (name in Slack) or Nguyen Tai Long -> n t long -> longnt.
-                    - Using email: thangbm (name in Slack) -> thangbm@kalapa.vn (email in Notion).
+                + If the user explicitly requests to mention Slack users, replace the assignees with Slack mention <@USER_ID> using the `slack_id` of each assignee. If `slack_id` is null, keep the assignee's name.
                 - When being asked about tasks in a specific time range, it includes both tasks that are CREATED or EDITED within that time range.
             
             - Use available tools when needed.
@@ -162,6 +201,16 @@ class MyAssistant:
             """,
             tools=self.tools
         )
+        self.functions = {
+            "fetch_notion_tasks": fetch_notion_tasks,
+            "get_list_of_users": get_list_of_users,
+            "fetch_channel_messages": fetch_channel_messages,
+            "get_list_of_channels": get_list_of_channels,
+            "get_request_report": get_request_report,
+            "query_request_counter": query_request_counter,
+            "summation_tool": summation_tool,
+            "get_today_date": get_today_date
+        }
 
         self.load_user_threads()
 
@@ -185,7 +234,7 @@ class MyAssistant:
         """
         thread_id = self.user_threads.get(thread_key)
         if not thread_id:
-            thread = openai.beta.threads.create()
+            thread = await self.client.beta.threads.create()
             thread_id = thread.id
             self.user_threads[thread_key] = thread_id
             # Save new thread to the database
@@ -195,26 +244,65 @@ class MyAssistant:
 
         user_id = thread_key.split(":")[0]
         # Call the assistant with the user's message
-        openai.beta.threads.messages.create(
+        await self.client.beta.threads.messages.create(
             thread_id=thread_id,
             role="user",
             content=f"User {user_id}: {message}"
         )
 
-        run = openai.beta.threads.runs.create(
+        # The fallback run shares the turn deadline with the first one
+        deadline = time.monotonic() + supervisor.turn_deadline
+        run_id, status = await self.run_thread(thread_id, deadline=deadline)
+        if status in ("failed", "incomplete") and self.model != FALLBACK_MODEL and time.monotonic() < deadline:
+            logging.warning(f"Run ended with status {status} on {self.model}, retrying with {FALLBACK_MODEL}")
+            run_id, status = await self.run_thread(thread_id, model=FALLBACK_MODEL, deadline=deadline)
+
+        # Only look at what this run produced; a failed or cancelled run may still have partial messages
+        messages = await self.client.beta.threads.messages.list(thread_id=thread_id, run_id=run_id, order="asc")
+        replies = [
+            c.text.value for m in messages.data if m.role == "assistant"
+            for c in m.content if c.type == "text"
+        ]
+        response_text = "\n\n".join(replies) if replies else NO_RESPONSE_TEXT
+        return response_text
+
+    async def run_thread(self, thread_id, model=None, deadline=None):
+        """
+        Run the assistant on a thread until the run ends or the turn deadline passes.
+
+        Args:
+            thread_id (str): The OpenAI thread ID.
+            model (str): Model to use instead of the assistant's own.
+            deadline (float): time.monotonic() by which the run must end (default: a whole turn from now).
+
+        Returns:
+            tuple: (run_id, status) with the final run status, or "timed_out".
+        """
+        run = await self.client.beta.threads.runs.create(
             thread_id=thread_id,
-            assistant_id=self.assistant.id
+            assistant_id=self.assistant.id,
+            **({"model": model} if model else {})
         )
+        if deadline is None:
+            deadline = time.monotonic() + supervisor.turn_deadline
         while True:
-            status = openai.beta.threads.runs.retrieve(
+            status = await self.client.beta.threads.runs.retrieve(
                 thread_id=thread_id, run_id=run.id)
             logging.info(f"Run status: {status.status}")
             if status.status == "completed":
-                break
-            elif status.status == "failed":
+                supervisor.record("completed")
+                return run.id, status.status
+            elif status.status in TERMINAL_RUN_STATUSES:
+                logging.error(
+                    f"❌ Run ended with status {status.status}. Details: {json.dumps(status.to_dict(), indent=2)}")
+                supervisor.record(status.status)
+                return run.id, status.status
+            elif time.monotonic() > deadline:
                 logging.error(
-                    f"❌ Run failed. Details: {json.dumps(status.to_dict(), indent=2)}")
-                break
+                    f"❌ Run {run.id} still {status.status} after {supervisor.turn_deadline}s, cancelling it")
+                await supervisor.cancel_assistant_run(self.client, thread_id, run.id)
+                supervisor.record("timed_out")
+                return run.id, "timed_out"
             elif status.status == "requires_action":
                 tool_outputs = []
                 for tool_call in status.required_action.submit_tool_outputs.tool_calls:
@@ -224,20 +312,8 @@ class MyAssistant:
                     try:
                         logging.info(
                             f"Calling function: {fn_name} with args: {args}")
-                        if fn_name == "fetch_notion_tasks":
-                            output = fetch_notion_tasks(**args)
-                        elif fn_name == "get_list_of_users":
-                            output = await get_list_of_users()
-                        elif fn_name == "fetch_channel_messages":
-                            output = await fetch_channel_messages(**args)
-                        elif fn_name == "get_list_of_channels":
-                            output = await get_list_of_channels()
-                        elif fn_name == "get_request_report":
-                            output = get_request_report(**args)
-                        elif fn_name == "summation_tool":
-                            output = summation_tool(**args)
-                        elif fn_name == "get_today_date":
-                            output = get_today_date()
+                        if fn_name in self.functions:
+                            output = await supervisor.call_tool(fn_name, self.functions[fn_name], **args)
                         else:
                             output = {"error": "Unknown function"}
                     except Exception as e:
@@ -246,57 +322,95 @@ class MyAssistant:
 
                     tool_outputs.append({
                         "tool_call_id": tool_call.id,
-                        "output": json.dumps(output)
+                        "output": encode_tool_output(fn_name, output)
                     })
 
-                openai.beta.threads.runs.submit_tool_outputs(
+                await self.client.beta.threads.runs.submit_tool_outputs(
                     thread_id=thread_id,
                     run_id=run.id,
                     tool_outputs=tool_outputs
                 )
             else:
-                time.sleep(1)
+                await asyncio.sleep(supervisor.poll_interval)
 
-        messages = openai.beta.threads.messages.list(thread_id=thread_id)
-        reply = next((m for m in messages.data if m.role == "assistant"), None)
-        response_text = reply.content[0].text.value if reply else "Không có phản hồi từ trợ lý."
-        return response_text
+    async def remember(self, message, response_text, thread_key):
+        """
+        Add an exchange answered outside the assistant (e.g. from a digest) to the user's thread.
+
+        Args:
+            message (str): The user's message.
+            response_text (str): The reply that was sent.
+        """
+        thread_id = self.user_threads.get(thread_key)
+        if not thread_id:
+            return
+        user_id = thread_key.split(":")[0]
+        await self.client.beta.threads.messages.create(thread_id=thread_id, role="user", content=f"User {user_id}: {message}")
+        await self.client.beta.threads.messages.create(thread_id=thread_id, role="assistant", content=response_text)
 
 
 class MyAgent():
-    def __init__(self):
-        self.request_monitor_agent = Agent(
+    def __init__(self, models=None, model_settings=None):
+        """
+        Args:
+            models (dict): Model per agent ("triage", "request_monitor", "task_monitor"), overriding AGENT_MODELS.
+            model_settings (dict): ModelSettings keyword arguments per agent, overriding AGENT_MODEL_SETTINGS.
+        """
+        self.models = {**AGENT_MODELS, **(models or {})}
+        self.model_settings = {**AGENT_MODEL_SETTINGS, **(model_settings or {})}
+        self.agent = self.build_agents(self.models)
+        self.request_monitor_agent, self.task_monitor_agent = self.agent.handoffs
+
+        # Same agents on the stronger model, used when a cheaper tier fails
+        fallback_models = {name: FALLBACK_MODEL for name in self.models}
+        if fallback_models == self.models:
+            self.fallback_agent = None
+        else:
+            self.fallback_agent = self.build_agents(fallback_models)
+
+        self.load_user_threads()
+
+    def build_agents(self, models):
+        """
+        Build the triage agent and the agents it hands off to.
+
+        Args:
+            models (dict): Model per agent.
+
+        Returns:
+            Agent: The triage agent.
+        """
+        request_monitor_agent = Agent(
             name="Request Monitor Agent",
             instructions="You are a helpful assistant that can analyze data and answer questions regarding number of requests that clients made in a specific range of time.\n"
             "Do not give answer if the client's name or URI did not match exactly with what you found. In that case, show the user the ambiguity and ask them to provide more information.\n"
             "If the question involves a summation, use the summation tool to calculate the result wherever needed. NEVER do the summation yourself.\n"
+            "For request counts reported in the *REQUEST COUNTER* Slack messages (per environment, client, URI, day or hour), use the query_request_counter tool.\n"
             "Answer in Vietnamese unless being asked to respond in English.\n"
             "ALWAYS provide a complete and final answer, never just your thinking process.",
             tools=[
-                ft_get_request_report, ft_get_today_date, ft_summation_tool
+                ft_get_request_report, ft_query_request_counter, ft_get_today_date, ft_summation_tool
             ],
-            model=DEFAULT_MODEL
+            model=models["request_monitor"],
+            model_settings=ModelSettings(**self.model_settings.get("request_monitor", {}))
         )
 
-        self.task_monitor_agent = Agent(
+        task_monitor_agent = Agent(
             name="Task Monitor Agent",
             instructions="You are a helpful assistant that can analyze tasks in a Notion database to answer questions or send alert regarding the status of tasks.\n"
-            "If requested, find the correct Slack ID of the corresponding user in the Notion database and replace the assignees with Slack mention <@USER_ID>.\n"
-            "You can map the Slack user to the Notion user using either the name or email field:\n"
-            "- Using name: Thang Bui Manh (name in Notion) -> thang b m -> thangbm (name in Slack) or Nguyen Tai Long -> n t long -> longnt.\n"
-            "- Using email: thangbm (name in Slack) -> thangbm@kalapa.vn (email in Notion).\n"
+            "If requested, replace the assignees with Slack mention <@USER_ID> using the `slack_id` of each assignee. If `slack_id` is null, keep the assignee's name.\n"
             "When being asked about tasks in a specific time range, it includes both tasks that are CREATED or EDITED within that time range.\n"
             "Answer in Vietnamese unless being asked to respond in English.\n"
             "ALWAYS provide a complete and final answer, never just your thinking process.",
             tools=[
                 ft_fetch_notion_tasks,
-                ft_get_today_date,
-                ft_get_list_of_users
+                ft_get_today_date
             ],
-            model=DEFAULT_MODEL
+            model=models["task_monitor"],
+            model_settings=ModelSettings(**self.model_settings.get("task_monitor", {}))
         )
 
-        self.agent = Agent(
+        return Agent(
             name="Personal slack assistant",
             instructions=(
                 "You are a helpful assistant that can respond to messages in Slack.\n"
@@ -306,12 +420,11 @@ class MyAgent():
                 "ALWAYS provide a complete and final answer, never just your thinking process.\n"
                 "End your responses with a clear summary or answer to the user's question."
             ),
-            handoffs=[self.request_monitor_agent, self.task_monitor_agent],
-            model=DEFAULT_MODEL
+            handoffs=[request_monitor_agent, task_monitor_agent],
+            model=models["triage"],
+            model_settings=ModelSettings(**self.model_settings.get("triage", {}))
         )
 
-        self.load_user_threads()
-
     def load_user_threads(self):
         """
         Load user threads from the database.
@@ -337,23 +450,118 @@ class MyAgent():
 
             logging.info(f"Created new thread: {thread_key}")
 
-        conversation = get_history_from_db(thread_key)
-        history = "\n\n".join(
-            [f"{m['role']}:\n{m['content']}" for m in conversation])
-        print(f"Conversation history:\n{history}")
+        conversation = get_stable_history_from_db(thread_key, HISTORY_WINDOW, HISTORY_WINDOW_STEP)
+        logging.debug(f"Conversation history: {len(conversation)} messages")
 
         user_id = thread_key.split(":")[0]
+        # Previous turns go first, unchanged from turn to turn, so the prompt prefix stays cacheable
+        input_items = [self.to_input_item(m["role"], m["content"]) for m in conversation]
+        input_items.append(self.to_input_item("user {}".format(user_id), message))
+
         # Call the agent with the user's message
-        result = await Runner.run(
-            self.agent,
-            "Previous conversation:\n\n{}.\n\nReply to the current message from user {}:\n{}".format(
-                history, user_id, message)
-        )
-        # print(result.to_input_list())
+        started = time.monotonic()
+        output, results = await self.run_tiered(input_items)
+        self.record_usage(thread_key, results, time.monotonic() - started)
+        response_text = output or NO_RESPONSE_TEXT
+
+        add_message_to_history(thread_key, "user {}".format(user_id), message)
+        add_message_to_history(thread_key, "assistant", response_text)
+        return response_text
 
+    async def remember(self, message, response_text, thread_key):
+        """
+        Add an exchange answered outside the agent (e.g. from a digest) to the conversation history.
+
+        Args:
+            message (str): The user's message.
+            response_text (str): The reply that was sent.
+        """
+        if thread_key not in self.user_threads:
+            self.user_threads[thread_key] = None
+            save_thread_to_db(thread_key, None)
+        user_id = thread_key.split(":")[0]
         add_message_to_history(thread_key, "user {}".format(user_id), message)
-        add_message_to_history(thread_key, "assistant", result.final_output)
-        return result.final_output
+        add_message_to_history(thread_key, "assistant", response_text)
+
+    async def run_tiered(self, input_items, hooks=None):
+        """
+        Run the tiered agents, retrying once on the fallback model if the run fails or
+        its answer does not pass validation. Both runs share one turn deadline, so there is
+        no retry after a run that timed out.
+
+        Args:
+            input_items (list): The run input.
+            hooks (RunHooks): Optional lifecycle hooks (used by the model evaluation).
+
+        Returns:
+            tuple: (output, results): the final output and the run result of every attempt
+            (two when the fallback ran), so usage can be accounted for both.
+        """
+        deadline = time.monotonic() + supervisor.turn_deadline
+        try:
+            output, result = await supervisor.run_agent(self.agent, input_items, hooks=hooks)
+            if self.fallback_agent is None or self.is_valid_output(output) or time.monotonic() >= deadline:
+                return output, [result]
+            results = [result]
+            reason = f"invalid output {output!r:.100}"
+        except (AgentsException, openai.OpenAIError) as e:
+            if self.fallback_agent is None or time.monotonic() >= deadline:
+                raise
+            reason = repr(e)
+            results = []
+
+        remaining = deadline - time.monotonic()
+        logging.warning(f"Retrying with fallback model {FALLBACK_MODEL} ({remaining:.1f}s left in the turn): {reason}")
+        supervisor.outcomes["fallback"] += 1
+        output, result = await supervisor.run_agent(self.fallback_agent, input_items, hooks=hooks, timeout=remaining)
+        return output, results + [result]
+
+    @staticmethod
+    def is_valid_output(output):
+        """
+        Whether an answer is acceptable: non-empty and not cut off mid-thought (e.g. ending with ":").
+        """
+        if not isinstance(output, str) or not output.strip():
+            return False
+        return not output.rstrip().endswith((":", "...", "…"))
+
+    @staticmethod
+    def to_input_item(role, content):
+        """
+        Convert a stored history message into a model input item.
+
+        Args:
+            role (str): The stored role, "user <USER_ID>" or "assistant".
+            content (str): The message text.
+
+        Returns:
+            dict: The input item.
+        """
+        if role.startswith("user"):
+            user_id = role[len("user"):].strip()
+            return {"role": "user", "content": f"User {user_id}: {content}" if user_id else content}
+        return {"role": "assistant", "content": content}
+
+    @staticmethod
+    def record_usage(thread_key, results, elapsed):
+        """
+        Log and store the token usage of a turn (all its attempts), including input tokens served
+        from the prompt cache.
+        """
+        input_tokens = cached_tokens = output_tokens = 0
+        responses = [response for result in results for response in result.raw_responses]
+        for response in responses:
+            usage = response.usage
+            input_tokens += usage.input_tokens
+            output_tokens += usage.output_tokens
+            details = getattr(usage, "input_tokens_details", None)
+            cached_tokens += getattr(details, "cached_tokens", 0) or 0
+
+        logging.info(
+            f"Run usage for {thread_key}: {len(responses)} model calls in {len(results)} attempt(s), "
+            f"{cached_tokens}/{input_tokens} input tokens cached, {output_tokens} output tokens, {elapsed:.1f}s")
+        record_run_usage(thread_key, len(responses), input_tokens,
+                         cached_tokens, output_tokens, int(elapsed * 1000))
 
 
 def create_assistant(type="assistant"):
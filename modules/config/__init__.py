@@ -1,14 +1,103 @@
 from dotenv import load_dotenv
 import os
+import json
 
 load_dotenv()
 
 SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN")
 SLACK_SIGNING_SECRET = os.environ.get("SLACK_SIGNING_SECRET")
+# App-level token (xapp-...) with the connections:write scope, needed for Socket Mode
+SLACK_APP_TOKEN = os.environ.get("SLACK_APP_TOKEN")
+# How Slack events reach the app: "http" (POST /slack/events) or "socket" (Socket Mode WebSocket)
+SLACK_TRANSPORT = os.environ.get("SLACK_TRANSPORT", "http")
 NOTION_API_KEY = os.environ.get("NOTION_API_KEY")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 NOTION_DATABASE_ID = "abdbe66c-c71f-4531-9d8c-7f97813f99d5"
 DEFAULT_MODEL = "gpt-4o"
 ASSISTANT_TYPE = os.environ.get("ASSISTANT_TYPE", "agent")
 THREAD_EXPIRATION_DAYS = 30
-THREAD_DATABASE_PATH = "conversation_threads.db"
\ No newline at end of file
+THREAD_DATABASE_PATH = "conversation_threads.db"
+
+# Admission control for the Slack message handler
+MAX_CONCURRENT_RUNS = int(os.environ.get("MAX_CONCURRENT_RUNS", 4))
+MAX_QUEUE_DEPTH = int(os.environ.get("MAX_QUEUE_DEPTH", 20))
+MAX_QUEUED_PER_USER = int(os.environ.get("MAX_QUEUED_PER_USER", 3))
+# Lanes in priority order (highest first): "dm" for direct messages, "channel" for everything else
+ADMISSION_LANES = [lane.strip() for lane in os.environ.get("ADMISSION_LANES", "dm,channel").split(",") if lane.strip()]
+
+# Run supervision: deadlines for a whole user turn and for each tool call
+RUN_TURN_DEADLINE_SECONDS = float(os.environ.get("RUN_TURN_DEADLINE_SECONDS", 120))
+TOOL_DEADLINE_SECONDS = float(os.environ.get("TOOL_DEADLINE_SECONDS", 30))
+RUN_POLL_INTERVAL_SECONDS = float(os.environ.get("RUN_POLL_INTERVAL_SECONDS", 1))
+AGENT_MAX_TURNS = int(os.environ.get("AGENT_MAX_TURNS", 10))
+# How long to wait for a cancelled Assistants API run to stop before the thread is used again
+RUN_CANCEL_WAIT_SECONDS = float(os.environ.get("RUN_CANCEL_WAIT_SECONDS", 10))
+
+# Notion-to-Slack identity index
+IDENTITY_OVERRIDES_PATH = os.environ.get("IDENTITY_OVERRIDES_PATH", "identity_overrides.json")
+IDENTITY_REFRESH_SECONDS = int(os.environ.get("IDENTITY_REFRESH_SECONDS", 6 * 60 * 60))
+
+# Output encoding per tool: "json", "tsv" or "csv" (header + rows for lists of records)
+TOOL_OUTPUT_FORMATS = dict(
+    item.strip().split("=", 1) for item in os.environ.get(
+        "TOOL_OUTPUT_FORMATS",
+        "fetch_notion_tasks=tsv,get_list_of_users=tsv,get_request_report=tsv,query_request_counter=tsv"
+    ).split(",") if "=" in item
+)
+
+# Conversation history sent to the agent: at least HISTORY_WINDOW messages, window start moves HISTORY_WINDOW_STEP at a time
+HISTORY_WINDOW = int(os.environ.get("HISTORY_WINDOW", 20))
+HISTORY_WINDOW_STEP = int(os.environ.get("HISTORY_WINDOW_STEP", 10))
+
+# Ingestion of *REQUEST COUNTER* messages into the local time series
+REQUEST_COUNTER_CHANNEL_ID = os.environ.get("REQUEST_COUNTER_CHANNEL_ID")
+REQUEST_COUNTER_POLL_SECONDS = int(os.environ.get("REQUEST_COUNTER_POLL_SECONDS", 300))
+REQUEST_COUNTER_BACKFILL_DAYS = int(os.environ.get("REQUEST_COUNTER_BACKFILL_DAYS", 90))
+
+# Scheduled digests. Entries are separated by ";", e.g. "tasks_in_progress_week=0 8 * * 1-5;requests_yesterday_per_client=0 7 * * *"
+DIGEST_SCHEDULES = dict(
+    item.strip().split("=", 1) for item in os.environ.get("DIGEST_SCHEDULES", "").split(";") if "=" in item
+)
+# Channels each digest is posted to, e.g. "tasks_in_progress_week=C123,C456;requests_yesterday_per_client=C789"
+DIGEST_CHANNELS = {
+    name.strip(): [c.strip() for c in channels.split(",") if c.strip()]
+    for name, channels in (
+        item.split("=", 1) for item in os.environ.get("DIGEST_CHANNELS", "").split(";") if "=" in item
+    )
+}
+DIGEST_POST_SCHEDULE = os.environ.get("DIGEST_POST_SCHEDULE", "0 8 * * 1-5")
+# Model used to answer a question from a digest; empty to reply with the rendered digest without a model call
+DIGEST_ANSWER_MODEL = os.environ.get("DIGEST_ANSWER_MODEL", "gpt-4o-mini")
+# Environment the per-client request digests count (REQUEST COUNTER messages also cover staging and dev)
+DIGEST_REQUEST_ENVIRONMENT = os.environ.get("DIGEST_REQUEST_ENVIRONMENT", "ekyc-api-prod")
+
+# Response cache for repeated questions
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 15 * 60))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 500))
+# How often Notion tasks and open-ended request reports behind cached answers are re-read
+RESPONSE_CACHE_REFRESH_SECONDS = int(os.environ.get("RESPONSE_CACHE_REFRESH_SECONDS", 60))
+# Comma-separated channel IDs that opt out of the response cache
+RESPONSE_CACHE_DISABLED_CHANNELS = [c.strip() for c in os.environ.get("RESPONSE_CACHE_DISABLED_CHANNELS", "").split(",") if c.strip()]
+
+# Model per agent. "triage" routes messages to the monitors; "assistant" is the Assistants API assistant
+AGENT_MODELS = {
+    "triage": os.environ.get("TRIAGE_MODEL", "gpt-4o-mini"),
+    "request_monitor": os.environ.get("REQUEST_MONITOR_MODEL", DEFAULT_MODEL),
+    "task_monitor": os.environ.get("TASK_MONITOR_MODEL", DEFAULT_MODEL),
+    "assistant": os.environ.get("ASSISTANT_MODEL", DEFAULT_MODEL),
+}
+# ModelSettings per agent, e.g. AGENT_MODEL_SETTINGS='{"triage": {"temperature": 0}}'
+AGENT_MODEL_SETTINGS = {
+    "triage": {"temperature": 0},
+    "request_monitor": {"temperature": 0},
+    **json.loads(os.environ.get("AGENT_MODEL_SETTINGS", "{}")),
+}
+# Stronger model a run is retried with when a cheaper one fails or gives an invalid answer
+FALLBACK_MODEL = os.environ.get("FALLBACK_MODEL", DEFAULT_MODEL)
+
+# Event loop monitoring and on-demand profiling
+LOOP_MONITOR_INTERVAL_SECONDS = float(os.environ.get("LOOP_MONITOR_INTERVAL_SECONDS", 0.05))
+LOOP_LAG_THRESHOLD_SECONDS = float(os.environ.get("LOOP_LAG_THRESHOLD_SECONDS", 0.1))
+PROFILE_MAX_SECONDS = int(os.environ.get("PROFILE_MAX_SECONDS", 60))
+# Bearer token for the /debug endpoints; they are disabled when unset
+DEBUG_API_TOKEN = os.environ.get("DEBUG_API_TOKEN")
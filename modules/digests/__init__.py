@@ -0,0 +1,238 @@
+from ..tools.notion_tool import fetch_notion_tasks
+from ..tools.request_tool import get_request_report
+from ..tools.request_counter_tool import query_request_counter
+from ..tools.slack_tool import client
+from ..config import (
+    OPENAI_API_KEY, DIGEST_SCHEDULES, DIGEST_CHANNELS, DIGEST_POST_SCHEDULE, DIGEST_ANSWER_MODEL,
+    DIGEST_REQUEST_ENVIRONMENT
+)
+from ..utils.common import normalize_text, markdown_to_slack
+from ..utils.db_utils import save_digest, load_digest
+from ..utils.encoding import encode
+from ..utils.schedule import CronSchedule
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import time
+import openai
+
+# Reply the answering model gives when the digest does not cover the question
+NO_ANSWER = "NO_ANSWER"
+
+
+class Digest:
+    """
+    A precomputed summary for a common question, refreshed on a cron schedule.
+    """
+
+    def __init__(self, name, schedule, max_age_seconds, patterns, period, build):
+        """
+        Args:
+            name (str): Digest name, used in config and storage.
+            schedule (str): Default cron expression for refreshing it (DIGEST_SCHEDULES overrides it).
+            max_age_seconds (int): How long a stored digest may be used to answer questions.
+            patterns (list[list[str]]): Questions match when, for every group, the normalized
+                question contains one of the group's phrases.
+            period (callable): Returns the period the digest should cover right now, e.g. yesterday's date.
+            build (callable): Takes the period and returns (content, data): the rendered Markdown summary
+                (or None) and compact source data (or None). Runs in a worker thread.
+        """
+        self.name = name
+        self.schedule = CronSchedule(DIGEST_SCHEDULES.get(name, schedule))
+        self.max_age_seconds = max_age_seconds
+        self.patterns = patterns
+        self.period = period
+        self.build = build
+
+    def matches(self, question):
+        normalized = normalize_text(question)
+        return all(any(phrase in normalized for phrase in group) for group in self.patterns)
+
+    def is_fresh(self, stored):
+        return (
+            stored is not None
+            and stored["period"] == self.period()
+            and time.time() - stored["computed_at"] <= self.max_age_seconds
+        )
+
+
+def _yesterday():
+    return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _freshness(computed_at):
+    return datetime.fromtimestamp(computed_at).strftime("%H:%M %d/%m")
+
+
+def build_tasks_in_progress_week(period):
+    tasks = [t for t in fetch_notion_tasks() if t["is_active"] and t["status"] in ("In progress", "Testing")]
+    lines = [f"**Tasks đang In progress / Testing trong 7 ngày qua** ({len(tasks)} tasks)"]
+    for status in ("In progress", "Testing"):
+        group = [t for t in tasks if t["status"] == status]
+        if not group:
+            continue
+        lines.append(f"\n**{status}** ({len(group)})")
+        for t in group:
+            assignees = ", ".join(a["name"] for a in t["assignee"]) or "chưa có assignee"
+            lines.append(f"• [{t['title']}]({t['url']}) — {assignees}")
+    return "\n".join(lines), encode(tasks, "tsv")
+
+
+def _build_requests_per_client(from_date, to_date, label):
+    per_client = query_request_counter(from_date, to_date, environment=DIGEST_REQUEST_ENVIRONMENT, group_by="client")
+    report = get_request_report(from_date, to_date if from_date == to_date else (
+        datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d"))
+
+    content = None
+    if isinstance(per_client, list):
+        total = sum(r["count"] for r in per_client)
+        lines = [f"**Số request theo client {label}** ({DIGEST_REQUEST_ENVIRONMENT}, tổng: {total:,})"]
+        lines += [f"• {r['client']}: {r['count']:,}" for r in sorted(per_client, key=lambda r: -r["count"])]
+        content = "\n".join(lines)
+
+    data = None
+    if not (isinstance(report, dict) and "error" in report):
+        data = encode(report, "tsv")
+    if content is None and data is None:
+        raise RuntimeError(f"No request data for {from_date} - {to_date}: {report}")
+    return content, data
+
+
+def build_requests_yesterday_per_client(period):
+    return _build_requests_per_client(period, period, f"ngày {period}")
+
+
+def build_requests_last_7_days_per_client(period):
+    from_date, to_date = period.split("/")
+    return _build_requests_per_client(from_date, to_date, f"từ {from_date} đến {to_date}")
+
+
+DIGESTS = [
+    Digest(
+        name="tasks_in_progress_week",
+        schedule="0 8-18/2 * * 1-5",
+        max_age_seconds=3 * 60 * 60,
+        patterns=[["task"], ["in progress", "dang lam", "dang thuc hien", "dang tien hanh"], ["7 ngay", "tuan qua", "past week", "last 7 days"]],
+        period=lambda: datetime.now().strftime("%Y-%m-%d"),
+        build=build_tasks_in_progress_week
+    ),
+    Digest(
+        name="requests_yesterday_per_client",
+        schedule="0 7 * * *",
+        max_age_seconds=24 * 60 * 60,
+        patterns=[["request"], ["hom qua", "yesterday"]],
+        period=_yesterday,
+        build=build_requests_yesterday_per_client
+    ),
+    Digest(
+        name="requests_last_7_days_per_client",
+        schedule="5 7 * * *",
+        max_age_seconds=24 * 60 * 60,
+        patterns=[["request"], ["7 ngay", "tuan qua", "last 7 days", "past week", "last week"]],
+        period=lambda: "{}/{}".format((datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"), _yesterday()),
+        build=build_requests_last_7_days_per_client
+    ),
+]
+
+async_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+
+async def run_digest(digest, post=False):
+    """
+    Recompute a digest, store it and optionally post it to its configured channels.
+    """
+    period = digest.period()
+    try:
+        content, data = await asyncio.to_thread(digest.build, period)
+    except Exception as e:
+        logging.error(f"Error building digest {digest.name}: {e}")
+        return None
+
+    computed_at = time.time()
+    save_digest(digest.name, period, content, data, computed_at)
+    logging.info(f"Digest {digest.name} refreshed for {period}")
+
+    if post and content:
+        for channel in DIGEST_CHANNELS.get(digest.name, []):
+            try:
+                await client.chat_postMessage(
+                    channel=channel,
+                    text=markdown_to_slack(f"{content}\n\n_Cập nhật lúc {_freshness(computed_at)}_")
+                )
+            except Exception as e:
+                logging.error(f"Error posting digest {digest.name} to {channel}: {e}")
+    return content
+
+
+async def run_digest_scheduler():
+    """
+    Keep digests fresh: build stale ones on startup, then refresh each one on its schedule
+    and post it to its channels on DIGEST_POST_SCHEDULE.
+    """
+    for digest in DIGESTS:
+        if not digest.is_fresh(load_digest(digest.name)):
+            await run_digest(digest)
+
+    post_schedule = CronSchedule(DIGEST_POST_SCHEDULE)
+    while True:
+        now = datetime.now()
+        next_post = post_schedule.next_after(now)
+        due = {}
+        for digest in DIGESTS:
+            next_refresh = digest.schedule.next_after(now)
+            if DIGEST_CHANNELS.get(digest.name) and next_post <= next_refresh:
+                due[digest] = (next_post, True)
+            else:
+                due[digest] = (next_refresh, False)
+
+        next_run = min(when for when, _ in due.values())
+        await asyncio.sleep(max(0, (next_run - datetime.now()).total_seconds()))
+        for digest, (when, post) in due.items():
+            if when == next_run:
+                await run_digest(digest, post=post)
+
+
+async def answer_from_digest(question):
+    """
+    Answer a question from a fresh digest, with at most one call to DIGEST_ANSWER_MODEL.
+
+    Returns:
+        str: The answer, or None if no fresh digest covers the question.
+    """
+    # Questions about a specific URI need more detail than the per-client digests hold
+    if "/" in question or "uri" in normalize_text(question):
+        return None
+
+    digest = next((d for d in DIGESTS if d.matches(question)), None)
+    if digest is None:
+        return None
+    stored = load_digest(digest.name)
+    if not digest.is_fresh(stored):
+        return None
+
+    freshness = f"\n\n_Dữ liệu cập nhật lúc {_freshness(stored['computed_at'])}_"
+    if not DIGEST_ANSWER_MODEL:
+        return stored["content"] + freshness if stored["content"] else None
+
+    try:
+        response = await async_client.chat.completions.create(
+            model=DIGEST_ANSWER_MODEL,
+            messages=[
+                {"role": "system", "content": (
+                    "Answer the user's question using only the precomputed summary and data below. "
+                    f"If they are not enough to answer it completely, reply exactly {NO_ANSWER}.\n"
+                    "Answer in Vietnamese unless being asked to respond in English.\n\n"
+                    f"Today is {datetime.now().strftime('%Y-%m-%d')}. The digest covers {stored['period']}.\n\n"
+                    f"Summary:\n{stored['content'] or '(none)'}\n\nData:\n{stored['data'] or '(none)'}"
+                )},
+                {"role": "user", "content": question}
+            ]
+        )
+    except openai.OpenAIError as e:
+        logging.error(f"Error answering from digest {digest.name}: {e}")
+        return None
+    answer = (response.choices[0].message.content or "").strip()
+    if not answer or NO_ANSWER in answer:
+        return None
+    logging.info(f"Answered from digest {digest.name}")
+    return answer + freshness
@@ -2,22 +2,27 @@ from ..config import NOTION_API_KEY, NOTION_DATABASE_ID
 from notion_client import Client
 from datetime import datetime, timedelta
 from agents import function_tool
+from ..utils.supervisor import supervisor
+from ..utils.identity import identity_index
+from ..utils.encoding import encode_tool_output
+from ..utils.data_versions import data_versions, fingerprint
 import logging
 
 
 notion = Client(auth=NOTION_API_KEY)
 
 @function_tool
-def ft_fetch_notion_tasks() -> list:
+async def ft_fetch_notion_tasks() -> str:
     '''
     Fetch tasks from Notion.
     Args:
         None
     Returns:
-        list: A list of tasks with their details.
+        str: The tasks with their details (a table with one row per task, times in UTC). Each assignee has a `slack_id` (None if unknown).
     '''
     logging.info("[Tool] fetch_notion_tasks")
-    return fetch_notion_tasks()
+    output = await supervisor.call_tool("fetch_notion_tasks", fetch_notion_tasks)
+    return encode_tool_output("fetch_notion_tasks", output)
 
 def fetch_notion_tasks() -> list:
     pages = notion.databases.query(
@@ -41,7 +46,7 @@ def fetch_notion_tasks() -> list:
         }
     )
 
-    return [{
+    tasks = [{
         "created_time": p.get("created_time"),
         "last_edited_time": p.get("last_edited_time"),
         "is_active": p.get("created_time") > (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d") or p.get("last_edited_time") > (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"),
@@ -50,6 +55,10 @@ def fetch_notion_tasks() -> list:
         "status": p.get("properties", {}).get("Status", {}).get("status", {}).get("name"),
         "assignee": [{
             "name": _p.get("name", "UNKNOWN"),
-            "email": _p.get("person", {}).get("email", "UNKNOWN")
+            "email": _p.get("person", {}).get("email", "UNKNOWN"),
+            "slack_id": identity_index.resolve(_p.get("name"), _p.get("person", {}).get("email"))
         } for _p in p.get("properties", {}).get("Assignee", {}).get("people", [])],
-    } for p in pages.get("results", []) if p.get("object") == "page"]
\ No newline at end of file
+    } for p in pages.get("results", []) if p.get("object") == "page"]
+    data_versions.observe("notion", "tasks", fingerprint(tasks))
+    data_versions.use("slack_directory", "members")
+    return tasks
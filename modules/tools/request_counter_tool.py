@@ -0,0 +1,111 @@
+from ..config import REQUEST_COUNTER_CHANNEL_ID, REQUEST_COUNTER_BACKFILL_DAYS
+from ..utils.db_utils import save_request_counts, query_request_counts, get_ingest_cursor, set_ingest_cursor
+from ..utils.request_counter import parse_request_counter
+from ..utils.supervisor import supervisor
+from ..utils.encoding import encode_tool_output
+from ..utils.data_versions import data_versions
+from .slack_tool import client as slack_client
+from datetime import datetime, timedelta
+from typing import Optional
+from agents import function_tool
+import logging
+import time
+
+GROUP_BY_FIELDS = ["environment", "client", "uri", "day", "hour"]
+
+
+async def ingest_request_counter_messages(channel_id: str = REQUEST_COUNTER_CHANNEL_ID) -> int:
+    '''
+    Ingest new *REQUEST COUNTER* messages from a Slack channel into the local time series.
+    Only messages newer than the last ingested one are fetched.
+    Returns:
+        int: The number of counter rows stored.
+    '''
+    oldest = get_ingest_cursor(channel_id)
+    if oldest is None:
+        oldest = str(time.time() - REQUEST_COUNTER_BACKFILL_DAYS * 24 * 60 * 60)
+
+    rows, newest, cursor = [], oldest, None
+    while True:
+        response = await slack_client.conversations_history(
+            channel=channel_id, oldest=oldest, limit=200, cursor=cursor)
+        for m in response["messages"]:
+            rows.extend(parse_request_counter(m.get("text", ""), m["ts"]))
+            if float(m["ts"]) > float(newest):
+                newest = m["ts"]
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+
+    save_request_counts(rows)
+    set_ingest_cursor(channel_id, newest)
+    if rows:
+        data_versions.bump("request_counter")
+        logging.info(f"Ingested {len(rows)} request counter rows from {channel_id}")
+    return len(rows)
+
+
+def ingest_request_counter_event(event: dict) -> int:
+    '''
+    Store a *REQUEST COUNTER* message received as a Slack event, without re-reading the channel.
+    Returns:
+        int: The number of counter rows stored.
+    '''
+    rows = parse_request_counter(event.get("text", ""), event["ts"])
+    save_request_counts(rows)
+    if rows:
+        data_versions.bump("request_counter")
+    last_ts = get_ingest_cursor(event["channel"])
+    if last_ts is not None and float(event["ts"]) > float(last_ts):
+        set_ingest_cursor(event["channel"], event["ts"])
+    return len(rows)
+
+
+def _parse_time(value: str, end: bool = False) -> float:
+    if len(value) == 10:
+        parsed = datetime.strptime(value, "%Y-%m-%d")
+        # A date-only end bound includes the whole day
+        return (parsed + timedelta(days=1) if end else parsed).timestamp()
+    return datetime.strptime(value, "%Y-%m-%d %H:%M").timestamp()
+
+
+@function_tool
+async def ft_query_request_counter(from_date: str, to_date: str, environment: Optional[str] = None,
+                                   client: Optional[str] = None, uri: Optional[str] = None,
+                                   group_by: str = "client,uri") -> str:
+    '''
+    Query request counts ingested from *REQUEST COUNTER* Slack messages.
+    Args:
+        from_date (str): Start of the range, "YYYY-MM-DD" or "YYYY-MM-DD HH:MM".
+        to_date (str): End of the range, "YYYY-MM-DD" (whole day included) or "YYYY-MM-DD HH:MM".
+        environment (str): Only count this environment, e.g. "ekyc-api-prod".
+        client (str): Only count this client.
+        uri (str): Only count this URI.
+        group_by (str): Comma-separated fields to group by: environment, client, uri, day, hour.
+    Returns:
+        str: Summed counts per group.
+    '''
+    logging.info("[Tool] query_request_counter({}, {}, {}, {}, {}, {})".format(
+        from_date, to_date, environment, client, uri, group_by))
+    output = await supervisor.call_tool(
+        "query_request_counter", query_request_counter, from_date, to_date, environment, client, uri, group_by)
+    return encode_tool_output("query_request_counter", output)
+
+
+def query_request_counter(from_date, to_date, environment=None, client=None, uri=None, group_by="client,uri"):
+    try:
+        start_ts, end_ts = _parse_time(from_date), _parse_time(to_date, end=True)
+    except (TypeError, ValueError):
+        return {"error": "from_date and to_date must be in YYYY-MM-DD or YYYY-MM-DD HH:MM format"}
+    if start_ts >= end_ts:
+        return {"error": "from_date must be before to_date"}
+
+    fields = [f.strip() for f in (group_by or "").split(",") if f.strip()]
+    unknown = [f for f in fields if f not in GROUP_BY_FIELDS]
+    if unknown:
+        return {"error": f"Unknown group_by fields: {unknown}. Use any of {GROUP_BY_FIELDS}"}
+
+    data_versions.use("request_counter")
+    results = query_request_counts(
+        start_ts, end_ts, {"environment": environment, "client": client, "uri": uri}, fields)
+    return results or {"error": "No request counter data in this range"}
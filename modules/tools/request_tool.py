@@ -3,6 +3,9 @@ import re
 import logging
 from typing import List
 from agents import function_tool
+from ..utils.supervisor import supervisor
+from ..utils.encoding import encode_tool_output
+from ..utils.data_versions import data_versions, fingerprint
 from datetime import datetime, timedelta
 
 @function_tool
@@ -28,17 +31,18 @@ def get_today_date() -> str:
     return datetime.now().strftime('%Y-%m-%d')
 
 @function_tool
-def ft_get_request_report(from_date: str, to_date: str) -> dict:    
+async def ft_get_request_report(from_date: str, to_date: str) -> str:    
     '''
     Fetch request report from the API.
     Args:
         from_date (str): The start date in YYYY-MM-DD format.
         to_date (str): The end date in YYYY-MM-DD format.
     Returns:
-        dict: The response from the API.
+        str: The response from the API (record lists are encoded as tables).
     '''
     logging.info("[Tool] get_request_report({}, {})".format(from_date, to_date))
-    return get_request_report(from_date, to_date)
+    output = await supervisor.call_tool("get_request_report", get_request_report, from_date, to_date)
+    return encode_tool_output("get_request_report", output)
 
 def get_request_report(from_date, to_date):
     if not from_date or not to_date:
@@ -64,6 +68,10 @@ def get_request_report(from_date, to_date):
     response = requests.request("GET", url, headers=headers)
 
     if response.status_code != 200:
+        data_versions.mark_uncacheable()
         return {"error": f"{response.status_code} - {response.text}"}
-    
-    return response.json()
+
+    report = response.json()
+    data_versions.observe("request_report", f"{from_date}/{to_date}", fingerprint(report))
+    return report
+
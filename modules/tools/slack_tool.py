@@ -2,6 +2,11 @@ from ..config import SLACK_BOT_TOKEN, SLACK_SIGNING_SECRET
 from slack_bolt.async_app import AsyncApp
 from datetime import datetime, timedelta
 from agents import function_tool
+from ..utils.supervisor import supervisor
+from ..utils.identity import identity_index
+from ..utils.encoding import encode_tool_output
+from ..utils.data_versions import data_versions, fingerprint
+from ..utils.db_utils import load_slack_directory
 import logging
 
 app = AsyncApp(token=SLACK_BOT_TOKEN, signing_secret=SLACK_SIGNING_SECRET)
@@ -9,21 +14,38 @@ app = AsyncApp(token=SLACK_BOT_TOKEN, signing_secret=SLACK_SIGNING_SECRET)
 client = app.client
 
 @function_tool
-async def ft_get_list_of_users() -> list:
+async def ft_get_list_of_users() -> str:
     '''
     Fetch a list of users in the Slack workspace.
     Returns:
-        list: A list of users with their IDs and names.
+        str: The users with their IDs and names (a table with one row per user).
     '''
     logging.info("[Tool] get_list_of_users")
-    return await get_list_of_users()
+    output = await supervisor.call_tool("get_list_of_users", get_list_of_users)
+    return encode_tool_output("get_list_of_users", output)
 
-async def get_list_of_users() -> list:
-    response = await client.users_list()
-    users = response["members"]
-    user_list = [{"id": user["id"], "name": user["name"]} for user in users if not user.get("is_bot") and user.get("id") != "USLACKBOT"]
-    # print(f"Users: {user_list}")
-    return user_list    
+async def fetch_slack_directory() -> list:
+    '''
+    Fetch all members of the Slack workspace (with profiles) and refresh the identity index.
+    '''
+    members, cursor = [], None
+    while True:
+        response = await client.users_list(cursor=cursor, limit=200)
+        members.extend(response["members"])
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+    identity_index.refresh(members)
+    return members
+
+def get_list_of_users() -> list:
+    # The directory is kept current by the periodic identity refresh; read the stored copy
+    users = load_slack_directory()
+    if not users:
+        return {"error": "The Slack directory has not been loaded yet, try again in a minute"}
+    user_list = [{"id": user["user_id"], "name": user["name"]} for user in users]
+    data_versions.use("slack_directory", "members")
+    return user_list
 
 @function_tool
 async def ft_fetch_channel_messages(channel_id: str, limit: int, days: int) -> list:
@@ -37,7 +59,7 @@ async def ft_fetch_channel_messages(channel_id: str, limit: int, days: int) -> l
         list: A list of messages from the channel.
     '''
     logging.info("[Tool] fetch_channel_messages({}, {}, {})".format(channel_id, limit, days))
-    return await fetch_channel_messages(channel_id, limit, days)
+    return await supervisor.call_tool("fetch_channel_messages", fetch_channel_messages, channel_id, limit, days)
     
 async def fetch_channel_messages(channel_id: str, limit: int, days: int) -> list:
     response = await client.conversations_history(
@@ -47,6 +69,7 @@ async def fetch_channel_messages(channel_id: str, limit: int, days: int) -> list
     )
 
     messages = response["messages"]
+    data_versions.observe("slack_messages", channel_id, fingerprint([m.get("ts") for m in messages]))
     # filtered_messages = [{    
     #     "time": m["ts"],
     #     "content": m["text"]
@@ -63,10 +86,11 @@ async def ft_get_list_of_channels() -> list:
         list: A list of channels with their IDs and names.
     '''
     logging.info("[Tool] get_list_of_channels")
-    return await get_list_of_channels()
+    return await supervisor.call_tool("get_list_of_channels", get_list_of_channels)
 
 async def get_list_of_channels() -> list:
     response = await client.conversations_list(types="public_channel,private_channel")
     channels = response["channels"]
+    data_versions.observe("slack_channels", "list", fingerprint([c.get("id") for c in channels]))
     # logging.info(f"Channels: {channels}")
     return channels
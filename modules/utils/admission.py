@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+
+class AdmissionRejected(Exception):
+    """Raised when a message cannot be queued because the queue is full."""
+
+
+class Ticket:
+    """A queued (or admitted) unit of work for one user in one lane."""
+
+    def __init__(self, user_id, lane, future):
+        self.user_id = user_id
+        self.lane = lane
+        self.future = future
+        self.position = 0
+
+
+class AdmissionController:
+    """
+    Caps the number of concurrent assistant runs.
+
+    Work that does not fit is queued per lane (e.g. DMs vs channels) and, within
+    a lane, per user. Lanes are served strictly by priority and users inside a
+    lane are served round-robin, so one chatty user cannot starve the others.
+    """
+
+    def __init__(self, max_concurrent, max_queue_depth, lanes, max_queued_per_user=None):
+        """
+        Args:
+            max_concurrent (int): Maximum number of runs executing at the same time.
+            max_queue_depth (int): Maximum number of waiting runs across all lanes.
+            lanes (list[str]): Lane names, highest priority first.
+            max_queued_per_user (int): Optional cap on waiting runs for a single user.
+        """
+        if not lanes:
+            raise ValueError("At least one admission lane is required (check ADMISSION_LANES)")
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_user = max_queued_per_user
+        self.lanes = list(lanes)
+        self._queues = {lane: OrderedDict() for lane in self.lanes}
+        self._running = 0
+        self._waiting = 0
+        self.rejected = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    def submit(self, user_id, lane):
+        """
+        Admit a run immediately or queue it.
+
+        Args:
+            user_id (str): The Slack user the run belongs to.
+            lane (str): The lane to queue the run in.
+
+        Returns:
+            Ticket: The ticket; `position` is 0 when admitted, otherwise its 1-based place in the queue.
+
+        Raises:
+            AdmissionRejected: If the queue (or the user's share of it) is full.
+        """
+        if lane not in self._queues:
+            lane = self.lanes[-1]
+
+        future = asyncio.get_running_loop().create_future()
+        ticket = Ticket(user_id, lane, future)
+
+        if self._running < self.max_concurrent and self._waiting == 0:
+            self._running += 1
+            future.set_result(True)
+            return ticket
+
+        if self._waiting >= self.max_queue_depth:
+            self.rejected += 1
+            raise AdmissionRejected(f"Queue is full ({self._waiting} waiting)")
+        user_queue = self._queues[lane].get(user_id)
+        if self.max_queued_per_user and user_queue and len(user_queue) >= self.max_queued_per_user:
+            self.rejected += 1
+            raise AdmissionRejected(f"User {user_id} already has {len(user_queue)} queued messages")
+
+        self._queues[lane].setdefault(user_id, deque()).append(ticket)
+        self._waiting += 1
+        ticket.position = self.position(ticket)
+        return ticket
+
+    async def wait(self, ticket):
+        """Wait until the ticket is admitted. A cancelled wait gives its slot back."""
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                self.release()
+            else:
+                self._discard(ticket)
+            raise
+
+    def release(self):
+        """Mark one admitted run as finished and admit the next waiting one."""
+        self._running -= 1
+        self._dispatch()
+
+    def position(self, ticket):
+        """
+        Return the 1-based position at which the ticket would be admitted, or 0 if it is not queued.
+        """
+        for index, queued in enumerate(self._service_order(), start=1):
+            if queued is ticket:
+                return index
+        return 0
+
+    def stats(self):
+        return {
+            "running": self._running,
+            "waiting": self._waiting,
+            "rejected": self.rejected,
+            "per_lane": {lane: sum(len(q) for q in users.values()) for lane, users in self._queues.items()},
+        }
+
+    def _service_order(self):
+        # Simulate the order _dispatch would follow without mutating the queues.
+        for lane in self.lanes:
+            users = [list(q) for q in self._queues[lane].values()]
+            depth = 0
+            while any(depth < len(q) for q in users):
+                for q in users:
+                    if depth < len(q):
+                        yield q[depth]
+                depth += 1
+
+    def _next_ticket(self):
+        for lane in self.lanes:
+            users = self._queues[lane]
+            if not users:
+                continue
+            user_id, queue = users.popitem(last=False)
+            ticket = queue.popleft()
+            if queue:
+                # Put the user at the back of the lane so others get their turn.
+                users[user_id] = queue
+            return ticket
+        return None
+
+    def _dispatch(self):
+        while self._running < self.max_concurrent:
+            ticket = self._next_ticket()
+            if ticket is None:
+                return
+            self._waiting -= 1
+            if ticket.future.done():
+                continue
+            self._running += 1
+            ticket.future.set_result(True)
+
+    def _discard(self, ticket):
+        users = self._queues[ticket.lane]
+        queue = users.get(ticket.user_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            self._waiting -= 1
+            if not queue:
+                del users[ticket.user_id]
+        logging.info(f"Dropped queued message for {ticket.user_id} ({ticket.lane} lane)")
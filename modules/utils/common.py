@@ -1,4 +1,5 @@
 import re
+import unicodedata
 
 def markdown_to_slack(md: str) -> str:
     """Convert basic Markdown to Slack-compatible mrkdwn."""
@@ -22,4 +23,15 @@ def markdown_to_slack(md: str) -> str:
     # Links: [text](url) → <url|text>
     md = re.sub(r"\[(.*?)\]\((.*?)\)", r"<\2|\1>", md)
 
-    return md
\ No newline at end of file
+    return md
+
+
+def strip_diacritics(text: str) -> str:
+    """Remove diacritics, e.g. "Nguyễn Tài Long" → "Nguyen Tai Long" (đ/Đ → d/D)."""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip diacritics and collapse whitespace for fuzzy comparisons."""
+    return " ".join(strip_diacritics(text).lower().split())
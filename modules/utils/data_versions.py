@@ -0,0 +1,88 @@
+import contextvars
+import hashlib
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class SourceTracker:
+    """Data read while answering one question, and whether the answer may be reused."""
+
+    def __init__(self):
+        # (source, key) -> version of that data when it was first read for this answer
+        self.versions = {}
+        self.cacheable = True
+
+    @property
+    def sources(self):
+        return {source for source, _ in self.versions}
+
+
+_tracker = contextvars.ContextVar("data_source_tracker", default=None)
+
+
+def fingerprint(data) -> str:
+    """Stable hash of JSON-like data."""
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class DataVersions:
+    """
+    Version counters for the data answers are built from (Notion tasks, request reports per
+    date range, the request counter time series, the Slack directory, ...).
+
+    Versions are kept per (source, key), where the key identifies what was read (e.g. a date
+    range), so a change to today's report does not invalidate answers about earlier ranges.
+    A version increases whenever data read for it differs from what was read before, so
+    anything derived from an older version can be recognised as stale.
+    """
+
+    def __init__(self):
+        self._versions = defaultdict(int)
+        self._fingerprints = {}
+
+    def observe(self, source, key, data_fingerprint):
+        """
+        Record that `key` of `source` was read with content `data_fingerprint`; its version
+        increases if that content changed.
+        """
+        if self._fingerprints.get((source, key)) != data_fingerprint:
+            self._fingerprints[(source, key)] = data_fingerprint
+            self._versions[(source, key)] += 1
+        self.use(source, key)
+
+    def bump(self, source, key=None):
+        """Record that data changed without reading it (e.g. new rows were ingested)."""
+        self._versions[(source, key)] += 1
+
+    def use(self, source, key=None):
+        """
+        Record that the current answer depends on `key` of `source`, at the version it has now
+        (later changes, even while the answer is still being built, make the answer stale).
+        """
+        tracker = _tracker.get()
+        if tracker is not None:
+            tracker.versions.setdefault((source, key), self._versions[(source, key)])
+
+    def mark_uncacheable(self):
+        """Record that the current answer is incomplete and must not be reused."""
+        tracker = _tracker.get()
+        if tracker is not None:
+            tracker.cacheable = False
+
+    def is_current(self, versions):
+        """Whether all (source, key) versions recorded by a SourceTracker are still the latest."""
+        return all(self._versions[source_key] == version for source_key, version in versions.items())
+
+    @contextmanager
+    def track(self):
+        """Collect the sources used while answering one question."""
+        tracker = SourceTracker()
+        token = _tracker.set(tracker)
+        try:
+            yield tracker
+        finally:
+            _tracker.reset(token)
+
+
+data_versions = DataVersions()
@@ -39,6 +39,62 @@ def init_db():
         FOREIGN KEY (thread_key) REFERENCES conversation_threads(thread_key) ON DELETE CASCADE
     )
     ''')
+    # Create run_usage table (token usage per agent run)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS run_usage (
+        usage_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        thread_key TEXT NOT NULL,
+        model_calls INTEGER,
+        input_tokens INTEGER,
+        cached_tokens INTEGER,
+        output_tokens INTEGER,
+        latency_ms INTEGER,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    # Create request_counter table (time series parsed from *REQUEST COUNTER* Slack messages)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS request_counter (
+        message_ts TEXT NOT NULL, -- Slack message timestamp
+        ts REAL NOT NULL, -- message time as a Unix timestamp
+        environment TEXT NOT NULL,
+        client TEXT NOT NULL,
+        uri TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (message_ts, environment, client, uri)
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_request_counter_ts ON request_counter (ts)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_request_counter_client_ts ON request_counter (client, ts)')
+    # Create ingest_cursors table (last ingested message per Slack channel)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ingest_cursors (
+        channel_id TEXT PRIMARY KEY,
+        last_ts TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    # Create digests table (precomputed summaries)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS digests (
+        name TEXT PRIMARY KEY,
+        period TEXT, -- what the digest covers, e.g. the date for a daily digest
+        content TEXT, -- rendered summary, NULL if it can only be answered from data
+        data TEXT, -- compact source data for answering follow-up questions
+        computed_at REAL NOT NULL -- Unix timestamp
+    )
+    ''')
+    # Create slack_users table (local copy of the Slack directory)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS slack_users (
+        user_id TEXT PRIMARY KEY,
+        name TEXT,
+        real_name TEXT,
+        display_name TEXT,
+        email TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
     conn.commit()
     conn.close()
     logging.info(f"Database initialized/verified: {DB_PATH}")
@@ -132,6 +188,51 @@ def get_history_from_db(thread_key: str, limit: int = 20) -> list[dict]:
         conn.close()
     return history
 
+# Get conversation history with a window that only moves in steps
+def get_stable_history_from_db(thread_key: str, window: int = 20, step: int = 10) -> list[dict]:
+    """
+    Retrieves at least the last `window` messages of a thread, oldest first.
+
+    The start of the window only moves forward `step` messages at a time, so consecutive
+    turns share the same leading messages and provider-side prompt caching can match them.
+    """
+    history = []
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM thread_messages WHERE thread_key = ?", (thread_key,))
+        total = cursor.fetchone()[0]
+        start = max(0, total - window)
+        start -= start % step
+        cursor.execute(
+            "SELECT role, content, timestamp FROM thread_messages WHERE thread_key = ? ORDER BY timestamp ASC, message_id ASC LIMIT -1 OFFSET ?",
+            (thread_key, start)
+        )
+        history = [dict(row) for row in cursor.fetchall()]
+        logging.debug(f"Retrieved {len(history)} of {total} messages from history for thread_key {thread_key}")
+    except sqlite3.Error as e:
+        logging.error(f"Error retrieving history for thread_key {thread_key}: {e}")
+    finally:
+        conn.close()
+    return history
+
+# Record token usage of an agent run
+def record_run_usage(thread_key: str, model_calls: int, input_tokens: int, cached_tokens: int, output_tokens: int, latency_ms: int):
+    """Stores the token usage and latency of one agent run."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO run_usage (thread_key, model_calls, input_tokens, cached_tokens, output_tokens, latency_ms, timestamp) VALUES (?, ?, ?, ?, ?, ?, datetime('now'))",
+            (thread_key, model_calls, input_tokens, cached_tokens, output_tokens, latency_ms)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Error recording run usage for thread_key {thread_key}: {e}")
+    finally:
+        conn.close()
+
 # Delete old threads from the database
 def cleanup_old_threads(days=30): # Defaulting to 30 days as in your original snippet
     """Delete conversation threads (and their messages due to CASCADE) 
@@ -152,4 +253,163 @@ def cleanup_old_threads(days=30): # Defaulting to 30 days as in your original sn
         conn.close()
     if deleted_count > 0:
         logging.info(f"Cleaned up {deleted_count} old conversation threads (and their messages).")
-    return deleted_count
\ No newline at end of file
+    return deleted_count
+
+# Replace the local copy of the Slack directory
+def save_slack_directory(users: list[dict]):
+    """Replace the stored Slack directory with the given users (dicts with user_id, name, real_name, display_name, email)."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM slack_users')
+        cursor.executemany(
+            "INSERT INTO slack_users (user_id, name, real_name, display_name, email, updated_at) VALUES (?, ?, ?, ?, ?, datetime('now'))",
+            [(u["user_id"], u.get("name"), u.get("real_name"), u.get("display_name"), u.get("email")) for u in users]
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Error saving Slack directory to DB: {e}")
+    finally:
+        conn.close()
+
+# Load the local copy of the Slack directory
+def load_slack_directory() -> list[dict]:
+    """Load the stored Slack directory."""
+    users = []
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT user_id, name, real_name, display_name, email FROM slack_users')
+        users = [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logging.error(f"Error loading Slack directory from DB: {e}")
+    finally:
+        conn.close()
+    return users
+
+
+# Store parsed request counter rows
+def save_request_counts(rows: list[dict]):
+    """Insert request counter rows; a row already ingested from the same message is replaced."""
+    if not rows:
+        return
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            "INSERT OR REPLACE INTO request_counter (message_ts, ts, environment, client, uri, count) VALUES (:message_ts, :ts, :environment, :client, :uri, :count)",
+            rows
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Error saving request counts to DB: {e}")
+    finally:
+        conn.close()
+
+# Query request counts in a time range
+def query_request_counts(start_ts: float, end_ts: float, filters: dict, group_by: list[str]) -> list[dict]:
+    """
+    Sum request counts with start_ts <= ts < end_ts.
+
+    Args:
+        filters (dict): Exact-match filters on environment, client or uri.
+        group_by (list[str]): Any of environment, client, uri, day, hour.
+    """
+    columns = {
+        "environment": "environment",
+        "client": "client",
+        "uri": "uri",
+        "day": "date(ts, 'unixepoch', 'localtime')",
+        "hour": "strftime('%Y-%m-%d %H:00', ts, 'unixepoch', 'localtime')",
+    }
+    group_by = [g for g in group_by if g in columns]
+    select = [f"{columns[g]} AS {g}" for g in group_by]
+    where, params = ["ts >= ?", "ts < ?"], [start_ts, end_ts]
+    for key in ("environment", "client", "uri"):
+        if filters.get(key):
+            where.append(f"{key} = ?")
+            params.append(filters[key])
+    group = f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else ""
+
+    results = []
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT {', '.join(select + ['SUM(count) AS count'])} FROM request_counter WHERE {' AND '.join(where)}{group}",
+            params
+        )
+        results = [dict(row) for row in cursor.fetchall() if row["count"] is not None]
+    except sqlite3.Error as e:
+        logging.error(f"Error querying request counts: {e}")
+    finally:
+        conn.close()
+    return results
+
+# Get the last ingested message timestamp of a channel
+def get_ingest_cursor(channel_id: str):
+    """Returns the timestamp of the last ingested message in a channel, or None."""
+    last_ts = None
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT last_ts FROM ingest_cursors WHERE channel_id = ?', (channel_id,))
+        row = cursor.fetchone()
+        last_ts = row[0] if row else None
+    except sqlite3.Error as e:
+        logging.error(f"Error reading ingest cursor for {channel_id}: {e}")
+    finally:
+        conn.close()
+    return last_ts
+
+# Set the last ingested message timestamp of a channel
+def set_ingest_cursor(channel_id: str, last_ts: str):
+    """Stores the timestamp of the last ingested message in a channel."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT OR REPLACE INTO ingest_cursors (channel_id, last_ts, updated_at) VALUES (?, ?, datetime('now'))",
+            (channel_id, last_ts)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Error saving ingest cursor for {channel_id}: {e}")
+    finally:
+        conn.close()
+
+
+# Store a precomputed digest
+def save_digest(name: str, period: str, content: str, data: str, computed_at: float):
+    """Stores (or replaces) a digest together with the time it was computed."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT OR REPLACE INTO digests (name, period, content, data, computed_at) VALUES (?, ?, ?, ?, ?)",
+            (name, period, content, data, computed_at)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Error saving digest {name}: {e}")
+    finally:
+        conn.close()
+
+# Load a precomputed digest
+def load_digest(name: str):
+    """Returns the stored digest as a dict, or None."""
+    digest = None
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT name, period, content, data, computed_at FROM digests WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        digest = dict(row) if row else None
+    except sqlite3.Error as e:
+        logging.error(f"Error loading digest {name}: {e}")
+    finally:
+        conn.close()
+    return digest
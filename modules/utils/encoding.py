@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime, timezone
+
+from ..config import TOOL_OUTPUT_FORMATS
+
+ISO_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$")
+DELIMITERS = {"tsv": "\t", "csv": ","}
+
+
+def normalize_date(value: str) -> str:
+    """Shorten ISO timestamps, e.g. "2025-05-01T03:04:00.000Z" → "2025-05-01 03:04Z" (UTC)."""
+    if not ISO_DATETIME.match(value):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        return parsed.strftime("%Y-%m-%d %H:%M")
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%MZ")
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return normalize_date(value).replace("\t", " ").replace("\n", "\\n")
+    if isinstance(value, dict):
+        # Nested records keep their column order from the header, e.g. assignee[name,email]
+        return ",".join(_cell(v) for v in value.values())
+    if isinstance(value, list):
+        return ";".join(_cell(v) for v in value)
+    return str(value)
+
+
+def _header(key, rows) -> str:
+    nested = next((v for v in (r.get(key) for r in rows) if v), None)
+    if isinstance(nested, list) and nested and isinstance(nested[0], dict):
+        return f"{key}[{','.join(nested[0].keys())}]"
+    if isinstance(nested, dict):
+        return f"{key}[{','.join(nested.keys())}]"
+    return key
+
+
+def is_records(value) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(r, dict) for r in value)
+
+
+def encode_records(records: list, fmt: str = "tsv") -> str:
+    """
+    Encode a list of dicts as a header line followed by one line per record.
+
+    Args:
+        records (list): Records; keys missing from a record are left empty.
+        fmt (str): "tsv" or "csv".
+
+    Returns:
+        str: The encoded table.
+    """
+    keys = list(dict.fromkeys(k for r in records for k in r))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=DELIMITERS[fmt], lineterminator="\n")
+    writer.writerow([_header(k, records) for k in keys])
+    for r in records:
+        writer.writerow([_cell(r.get(k)) for k in keys])
+    return buffer.getvalue().rstrip("\n")
+
+
+def encode(output, fmt: str = "json") -> str:
+    """
+    Serialize a tool result for the model.
+
+    Args:
+        output: The tool result.
+        fmt (str): "json" (unchanged behaviour), "tsv" or "csv". Lists of records become tables;
+            dicts holding such lists get one section per key. Anything else stays JSON.
+
+    Returns:
+        str: The encoded result.
+    """
+    if fmt not in DELIMITERS:
+        return json.dumps(output)
+    if is_records(output):
+        return encode_records(output, fmt)
+    if isinstance(output, dict) and any(is_records(v) for v in output.values()):
+        sections = []
+        for key, value in output.items():
+            if is_records(value):
+                sections.append(f"{key}:\n{encode_records(value, fmt)}")
+            else:
+                sections.append(f"{key}: {json.dumps(value, ensure_ascii=False)}")
+        return "\n\n".join(sections)
+    return json.dumps(output)
+
+
+def encode_tool_output(tool_name: str, output) -> str:
+    """Serialize a tool result using the format configured for that tool in TOOL_OUTPUT_FORMATS."""
+    return encode(output, TOOL_OUTPUT_FORMATS.get(tool_name, "json"))
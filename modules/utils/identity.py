@@ -0,0 +1,147 @@
+import json
+import hashlib
+import logging
+import os
+import re
+from collections import defaultdict
+
+from .common import normalize_text
+from .db_utils import save_slack_directory, load_slack_directory
+from .data_versions import data_versions
+from ..config import IDENTITY_OVERRIDES_PATH
+
+
+def _handle(text):
+    """Reduce a Slack handle or name to lowercase ASCII letters and digits."""
+    return re.sub(r"[^a-z0-9]", "", normalize_text(text or ""))
+
+
+def _handle_candidates(name):
+    """
+    Slack handles a person could have, given their Notion name.
+
+    Vietnamese names can be written family-name-first ("Nguyen Tai Long" -> longnt)
+    or given-name-first ("Thang Bui Manh" -> thangbm), so both readings are produced.
+    """
+    tokens = [t for t in re.split(r"[^a-z0-9]+", normalize_text(name or "")) if t]
+    if len(tokens) < 2:
+        return set(tokens)
+    return {
+        tokens[0] + "".join(t[0] for t in tokens[1:]),
+        tokens[-1] + "".join(t[0] for t in tokens[:-1]),
+        "".join(tokens),
+    }
+
+
+def _name_key(name):
+    """Order-insensitive key for a full name."""
+    return " ".join(sorted(normalize_text(name or "").split()))
+
+
+def load_overrides(path=IDENTITY_OVERRIDES_PATH):
+    """
+    Load manual Notion-to-Slack overrides.
+
+    The file is a JSON object mapping a Notion email or name to a Slack user ID,
+    e.g. {"thangbm@kalapa.vn": "U012AB3CD", "Nguyen Tai Long": "U045EF6GH"}.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"Error loading identity overrides from {path}: {e}")
+        return {}
+    return {normalize_text(k): v for k, v in overrides.items()}
+
+
+class IdentityIndex:
+    """
+    Resolves Notion people (name and email) to Slack user IDs.
+
+    Built from the Slack directory and kept in the database, so it is available
+    to synchronous tools without calling Slack.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._loaded = False
+        self._overrides = {}
+        self._by_email = {}
+        self._by_handle = {}
+        self._by_name = {}
+
+    def refresh(self, members):
+        """
+        Rebuild the index from a Slack `users.list` response and persist the directory.
+
+        Args:
+            members (list): Raw Slack members.
+        """
+        users = [{
+            "user_id": m["id"],
+            "name": m.get("name"),
+            "real_name": m.get("profile", {}).get("real_name") or m.get("real_name"),
+            "display_name": m.get("profile", {}).get("display_name"),
+            "email": m.get("profile", {}).get("email"),
+        } for m in members if not m.get("is_bot") and not m.get("deleted") and m.get("id") != "USLACKBOT"]
+        save_slack_directory(users)
+        self._build(users)
+        data_versions.observe("slack_directory", "members", self.version)
+        logging.info(f"Identity index refreshed with {len(users)} Slack users (version {self.version})")
+
+    def resolve(self, name=None, email=None):
+        """
+        Return the Slack user ID for a Notion person, or None if there is no unambiguous match.
+        """
+        if not self._loaded:
+            self._build(load_slack_directory())
+
+        for key in (email, name):
+            if key and normalize_text(key) in self._overrides:
+                return self._overrides[normalize_text(key)]
+
+        if email and "@" in email:
+            email = email.lower()
+            if email in self._by_email:
+                return self._by_email[email]
+            slack_id = self._unique(self._by_handle.get(_handle(email.split("@")[0])))
+            if slack_id:
+                return slack_id
+
+        if name:
+            slack_id = self._unique(self._by_name.get(_name_key(name)))
+            if slack_id:
+                return slack_id
+            matches = set()
+            for candidate in _handle_candidates(name):
+                matches |= self._by_handle.get(candidate, set())
+            return self._unique(matches)
+        return None
+
+    def _build(self, users):
+        by_email, by_handle, by_name = {}, defaultdict(set), defaultdict(set)
+        for u in users:
+            if u.get("email"):
+                by_email[u["email"].lower()] = u["user_id"]
+            if u.get("name"):
+                by_handle[_handle(u["name"])].add(u["user_id"])
+            for name in (u.get("real_name"), u.get("display_name")):
+                if name and len(name.split()) > 1:
+                    by_name[_name_key(name)].add(u["user_id"])
+
+        fingerprint = json.dumps(sorted((u["user_id"], u.get("name"), u.get("email")) for u in users))
+        self._overrides = load_overrides()
+        self._by_email, self._by_handle, self._by_name = by_email, dict(by_handle), dict(by_name)
+        self.version = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+        self._loaded = True
+
+    @staticmethod
+    def _unique(user_ids):
+        if user_ids and len(user_ids) == 1:
+            return next(iter(user_ids))
+        return None
+
+
+identity_index = IdentityIndex()
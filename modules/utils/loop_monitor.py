@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Frames under this directory (but not in a virtualenv or site-packages) are our code
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _is_project_file(filename):
+    return filename.startswith(PROJECT_ROOT) and "site-packages" not in filename and f"{os.sep}venv" not in filename
+
+
+def _frames(frame):
+    """Frames from outermost to innermost as (module, function, filename, line)."""
+    frames = []
+    while frame is not None:
+        frames.append((frame.f_globals.get("__name__", "?"), frame.f_code.co_name, frame.f_code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    return frames[::-1]
+
+
+class LoopMonitor:
+    """
+    Detects event loop stalls (blocking calls inside async code) and records where they happened.
+
+    A heartbeat coroutine ticks every `interval` seconds; a watchdog thread notices when a
+    tick is late by half the threshold and captures the loop thread's stack while it is still
+    blocked, so the record of a stall (a tick late by more than `threshold`) points at the
+    blocking call itself.
+    """
+
+    def __init__(self, interval, threshold, max_records=100):
+        """
+        Args:
+            interval (float): Seconds between heartbeats.
+            threshold (float): Lag in seconds above which the loop counts as stalled.
+            max_records (int): Number of recent stalls kept.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.records = deque(maxlen=max_records)
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.max_lag = 0.0
+        self.origins = Counter()
+        self._beat = None
+        # Stack captured by the watchdog for the current beat; shared with the watchdog thread
+        self._current = None
+        self._lock = threading.Lock()
+        self._captures = []
+        self._loop_thread_id = None
+        self._task = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+        logging.info(f"Event loop monitor started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            beat = time.monotonic()
+            with self._lock:
+                self._beat, self._current = beat, None
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - beat - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            with self._lock:
+                record, self._current = self._current, None
+            if lag > self.threshold:
+                self._finish_stall(lag, record)
+
+    def _watch(self):
+        # Poll often enough to catch a stall only slightly longer than the threshold
+        while not self._stopped.wait(min(self.interval, self.threshold) / 4):
+            with self._lock:
+                beat = self._beat
+                if self._current is not None or time.monotonic() - beat - self.interval <= self.threshold / 2:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            frames = _frames(frame)
+            if frames[-1][0] == __name__:
+                # The loop is already running the heartbeat again, the stall is over
+                continue
+            with self._lock:
+                # Keep the stack only if the loop is still on the beat it was taken for
+                if self._beat == beat and self._current is None:
+                    self._current = self._stall_record(frames)
+
+    @staticmethod
+    def _stall_record(frames):
+        project = [f for f in frames if _is_project_file(f[2])]
+        origin = project[-1] if project else frames[-1]
+        return {
+            "started_at": datetime.now().isoformat(timespec="milliseconds"),
+            "origin": f"{origin[0]}:{origin[1]} ({os.path.relpath(origin[2], PROJECT_ROOT)}:{origin[3]})",
+            "blocked_in": f"{frames[-1][0]}:{frames[-1][1]}",
+            "stack": [f"{module}:{function} ({os.path.basename(filename)}:{line})" for module, function, filename, line in frames],
+            "lag_ms": None,
+        }
+
+    def _finish_stall(self, lag, record):
+        if record is None:
+            # Shorter than the watchdog could catch; keep the lag without a stack
+            record = {"started_at": datetime.now().isoformat(timespec="milliseconds"),
+                      "origin": "unknown", "blocked_in": "unknown", "stack": []}
+        record["lag_ms"] = round(lag * 1000, 1)
+        self.stalls += 1
+        self.stalled_seconds += lag
+        self.origins[record["origin"]] += 1
+        self.records.append(record)
+        for captured in self._captures:
+            captured.append(record)
+        logging.warning(f"Event loop blocked for {record['lag_ms']} ms by {record['origin']} in {record['blocked_in']}")
+
+    @contextmanager
+    def capture(self):
+        """
+        Collect the stalls that happen inside the block, e.g. to assert that a handler never blocks:
+
+            with loop_monitor.capture() as stalls:
+                await handle_message(event, say)
+            assert not stalls
+        """
+        captured = []
+        self._captures.append(captured)
+        try:
+            yield captured
+        finally:
+            self._captures.remove(captured)
+
+    def stats(self):
+        return {
+            "running": self._task is not None,
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "stalled_seconds": round(self.stalled_seconds, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "top_origins": self.origins.most_common(10),
+            "recent": list(self.records)[-20:],
+        }
+
+
+def sample_profile(seconds, interval=0.005, loop_thread_only=False, loop_thread_id=None):
+    """
+    Sample the stacks of running threads for `seconds` and return them in collapsed-stack format
+    ("frame;frame;frame count" per line), which flamegraph.pl, speedscope and inferno read directly.
+
+    Runs in the calling thread; call it from a worker thread, not from the event loop.
+    """
+    samples = Counter()
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me or (loop_thread_only and thread_id != loop_thread_id):
+                continue
+            stack = ";".join(f"{module}:{function}" for module, function, _, _ in _frames(frame))
+            samples[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common())
@@ -0,0 +1,73 @@
+"""
+Parser for *REQUEST COUNTER* messages posted to Slack.
+
+A message starts with "*REQUEST COUNTER*" and names the environment either on a
+labelled line ("Environment: ekyc-api-prod") or anywhere as a "<name>-prod/-staging/..."
+token. Each counter line then gives a client, a URI and a count, e.g.
+
+    *REQUEST COUNTER* ekyc-api-prod
+    • vpbank | /api/ekyc/ocr: 1,204
+    | tpbank | /api/ekyc/face-match | 87 |
+    client=momo uri=/api/ekyc/liveness count=310
+"""
+import re
+
+REQUEST_COUNTER_HEADER = "*REQUEST COUNTER*"
+
+ENV_LABEL = re.compile(r"\b(?:env|environment|service)\b\W*[:=]\s*[*_`]*([\w.-]+)", re.IGNORECASE)
+ENV_TOKEN = re.compile(r"\b([\w.]+(?:-[\w.]+)*-(?:prod|production|staging|stg|dev|uat|test|sandbox))\b", re.IGNORECASE)
+ROW_DELIMITED = re.compile(
+    r"^[\s•*>|\-_`]*(?P<client>[\w.@-]+)[\s*_`]*[|,:–-]\s*[*_`]*(?P<uri>/[^\s:|*`]*)[*_`]*\s*[|:=,–-]\s*[*_`]*(?P<count>\d[\d,.]*)"
+)
+ROW_KEY_VALUE = re.compile(
+    r"client\W*[:=]\s*(?P<client>[\w.@-]+).*?uri\W*[:=]\s*(?P<uri>/\S*?)[,;]?\s.*?count\W*[:=]\s*(?P<count>\d[\d,.]*)",
+    re.IGNORECASE
+)
+
+
+def is_request_counter_message(text: str) -> bool:
+    return bool(text) and text.lstrip().startswith(REQUEST_COUNTER_HEADER)
+
+
+def _count(value: str) -> int:
+    return int(re.sub(r"[,.]", "", value))
+
+
+def parse_request_counter(text: str, message_ts: str) -> list[dict]:
+    """
+    Parse a *REQUEST COUNTER* message into counter rows.
+
+    Args:
+        text (str): The Slack message text.
+        message_ts (str): The Slack message timestamp ("1716960000.123456").
+
+    Returns:
+        list[dict]: Rows with message_ts, ts, environment, client, uri and count. Empty if
+        the message is not a request counter message.
+    """
+    if not is_request_counter_message(text):
+        return []
+
+    label = ENV_LABEL.search(text)
+    token = ENV_TOKEN.search(text)
+    environment = label.group(1) if label else token.group(1) if token else "unknown"
+
+    rows = {}
+    for line in text.splitlines()[1:] if "\n" in text else []:
+        if ENV_LABEL.search(line) and not ROW_KEY_VALUE.search(line):
+            continue
+        match = ROW_KEY_VALUE.search(line) or ROW_DELIMITED.match(line)
+        if not match:
+            continue
+        key = (match.group("client"), match.group("uri"))
+        # A client/URI pair listed twice in one message is counted once (last value wins)
+        rows[key] = _count(match.group("count"))
+
+    return [{
+        "message_ts": message_ts,
+        "ts": float(message_ts),
+        "environment": environment,
+        "client": client,
+        "uri": uri,
+        "count": count,
+    } for (client, uri), count in rows.items()]
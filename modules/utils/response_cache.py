@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from .common import normalize_text
+from .data_versions import data_versions
+from ..tools.request_tool import get_today_date, get_request_report
+from ..tools.notion_tool import fetch_notion_tasks
+
+# Day/month dates such as "15/5" or "01-05-2025", but not parts of ISO dates ("2025-05-01")
+DATE_DMY = re.compile(r"(?<![\d/-])(\d{1,2})[/-](\d{1,2})(?:[/-](\d{4}))?(?![\d/-])")
+
+# Sources whose versions move when their data changes, without anyone asking a question:
+# the request counter and the Slack directory through their ingest and refresh jobs, Notion
+# tasks and request reports through ResponseCache.refresh_sources. Answers that read any
+# other source (e.g. Slack channel messages) are not cached.
+REFRESHED_SOURCES = {"notion", "request_report", "request_counter", "slack_directory"}
+
+
+def normalize_question(question: str) -> str:
+    """
+    Reduce a question to a cache key: lowercase, no diacritics or punctuation, and relative
+    date expressions ("hôm nay", "yesterday", "tuần này", "15/5", ...) replaced by the dates
+    they mean today.
+    """
+    today = datetime.strptime(get_today_date(), "%Y-%m-%d")
+    text = normalize_text(question)
+
+    def to_iso(match):
+        day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3) or today.year)
+        try:
+            return datetime(year, month, day).strftime("%Y-%m-%d")
+        except ValueError:
+            return match.group(0)
+
+    text = DATE_DMY.sub(to_iso, text)
+    week_start = today - timedelta(days=today.weekday())
+    replacements = [
+        (r"\b(hom nay|today)\b", today.strftime("%Y-%m-%d")),
+        (r"\b(hom qua|yesterday)\b", (today - timedelta(days=1)).strftime("%Y-%m-%d")),
+        (r"\b(tuan nay|this week)\b", "week " + week_start.strftime("%Y-%m-%d")),
+        (r"\b(tuan truoc|last week)\b", "week " + (week_start - timedelta(days=7)).strftime("%Y-%m-%d")),
+        (r"\b(thang nay|this month)\b", "month " + today.strftime("%Y-%m")),
+    ]
+    for pattern, value in replacements:
+        text = re.sub(pattern, value, text)
+    text = re.sub(r"[^\w\s:-]", " ", text)
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """
+    Caches answers to repeated questions asked in the same channel.
+
+    Entries are per channel: a DM channel is private to one user and the bot, and an answer
+    posted in a shared channel is already visible to everyone in it.
+
+    An entry is reused only while every data source it was built from still has the same
+    version (see DataVersions) and it is younger than the TTL. Versions only move when a
+    source is read again, so refresh_sources must run periodically; a cached answer can then
+    lag its data by at most that period. Answers that read no data source (e.g. follow-ups
+    built from the conversation) or a source that is not refreshed are not cached.
+    """
+
+    def __init__(self, ttl_seconds, max_entries, disabled_channels=(), min_words=3):
+        """
+        Args:
+            ttl_seconds (int): Maximum age of a reused answer.
+            max_entries (int): Number of answers kept (least recently used are dropped).
+            disabled_channels (iterable): Channel IDs that opted out of caching.
+            min_words (int): Shorter messages are usually follow-ups that depend on the conversation
+                and are not cached.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.disabled_channels = set(disabled_channels)
+        self.min_words = min_words
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def enabled_for(self, question, channel_id):
+        return channel_id not in self.disabled_channels and len(question.split()) >= self.min_words
+
+    def lookup(self, question, channel_id):
+        """Return the answer cached for this question in this channel, or None."""
+        if not self.enabled_for(question, channel_id):
+            return None
+
+        key = (channel_id, normalize_question(question))
+        entry = self._entries.get(key)
+        if entry and time.time() - entry["created_at"] <= self.ttl_seconds and data_versions.is_current(entry["versions"]):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logging.info(f"Response cache hit for '{key[1]}' in {channel_id} (hit rate {self.hit_rate():.0%})")
+            return entry["response"]
+
+        if entry:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def store(self, question, channel_id, response, tracker):
+        """
+        Cache an answer.
+
+        Args:
+            tracker (SourceTracker): The sources the answer was built from.
+        """
+        if not tracker.cacheable or not self.enabled_for(question, channel_id):
+            return
+        if not tracker.sources or not tracker.sources <= REFRESHED_SOURCES:
+            return
+        key = (channel_id, normalize_question(question))
+        self._entries[key] = {
+            "response": response,
+            "versions": dict(tracker.versions),
+            "created_at": time.time(),
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def data_in_use(self):
+        """(source, key) pairs the unexpired entries were built from."""
+        now = time.time()
+        return {
+            source_key for entry in self._entries.values() if now - entry["created_at"] <= self.ttl_seconds
+            for source_key in entry["versions"]
+        }
+
+    async def refresh_sources(self):
+        """
+        Re-read the Notion tasks and the request reports that cached answers depend on, so their
+        versions move if the data changed. Reports for ranges that ended before today are final
+        and not re-read.
+        """
+        in_use = self.data_in_use()
+        if any(source == "notion" for source, _ in in_use):
+            await asyncio.to_thread(fetch_notion_tasks)
+        today = get_today_date()
+        for source, key in in_use:
+            if source == "request_report":
+                from_date, to_date = key.split("/")
+                if to_date >= today:
+                    await asyncio.to_thread(get_request_report, from_date, to_date)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate()}
@@ -0,0 +1,142 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import Counter
+
+import openai
+from agents import ItemHelpers, Runner
+from agents.exceptions import MaxTurnsExceeded
+
+from .data_versions import data_versions
+from ..config import (
+    RUN_TURN_DEADLINE_SECONDS, TOOL_DEADLINE_SECONDS, RUN_POLL_INTERVAL_SECONDS, AGENT_MAX_TURNS,
+    RUN_CANCEL_WAIT_SECONDS
+)
+
+# Assistants API run statuses after which the run will never change again
+TERMINAL_RUN_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete"}
+
+
+class RunSupervisor:
+    """
+    Enforces deadlines on assistant runs and tool calls, and counts how runs end.
+    """
+
+    def __init__(self, turn_deadline, tool_deadline, poll_interval, max_turns, cancel_wait):
+        """
+        Args:
+            turn_deadline (float): Seconds a single user turn may take end to end.
+            tool_deadline (float): Seconds a single tool call may take.
+            poll_interval (float): Seconds between run status polls (Assistants API).
+            max_turns (int): Maximum number of agent turns per run (Agents SDK).
+            cancel_wait (float): Seconds to wait for a cancelled run to stop (Assistants API).
+        """
+        self.turn_deadline = turn_deadline
+        self.tool_deadline = tool_deadline
+        self.poll_interval = poll_interval
+        self.max_turns = max_turns
+        self.cancel_wait = cancel_wait
+        self.outcomes = Counter()
+
+    def record(self, outcome):
+        """Count a run or tool outcome, e.g. "completed", "expired" or "timed_out"."""
+        self.outcomes[outcome] += 1
+        if outcome != "completed":
+            # Answers from runs that did not complete normally must not be cached
+            data_versions.mark_uncacheable()
+            logging.warning(f"Run outcome: {outcome} (totals: {dict(self.outcomes)})")
+
+    def stats(self):
+        return dict(self.outcomes)
+
+    async def call_tool(self, name, fn, *args, **kwargs):
+        """
+        Call a tool under the tool deadline. Sync tools run in a worker thread.
+
+        Returns:
+            The tool's output, or an error dict if it failed to finish in time.
+        """
+        if inspect.iscoroutinefunction(fn):
+            call = fn(*args, **kwargs)
+        else:
+            call = asyncio.to_thread(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(call, timeout=self.tool_deadline)
+        except asyncio.TimeoutError:
+            self.record("tool_timed_out")
+            logging.error(f"Tool {name} did not finish within {self.tool_deadline}s")
+            return {"error": f"{name} did not finish within {self.tool_deadline} seconds"}
+
+    async def cancel_assistant_run(self, client, thread_id, run_id):
+        """
+        Cancel an Assistants API run server-side and wait until it has stopped, since a thread
+        does not accept new messages while a run is still active on it.
+
+        Args:
+            client (openai.AsyncOpenAI): The client the run was created with.
+
+        Returns:
+            str: The last run status seen.
+        """
+        try:
+            await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+        except openai.OpenAIError as e:
+            # The run may have reached a terminal state in the meantime
+            logging.warning(f"Could not cancel run {run_id}: {e}")
+
+        status = "cancelling"
+        deadline = time.monotonic() + self.cancel_wait
+        while time.monotonic() < deadline:
+            try:
+                status = (await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)).status
+            except openai.OpenAIError as e:
+                logging.warning(f"Could not check cancelled run {run_id}: {e}")
+            if status in TERMINAL_RUN_STATUSES:
+                logging.info(f"Run {run_id} on thread {thread_id} stopped with status {status}")
+                return status
+            await asyncio.sleep(self.poll_interval)
+        logging.warning(f"Run {run_id} on thread {thread_id} still {status} after {self.cancel_wait}s")
+        return status
+
+    async def run_agent(self, agent, input, hooks=None, timeout=None):
+        """
+        Run an Agents SDK agent under the turn deadline.
+
+        Args:
+            agent (Agent): The starting agent.
+            input (str | list): The run input.
+            hooks (RunHooks): Optional lifecycle hooks.
+            timeout (float): Seconds the run may take, if less than a whole turn is left.
+
+        Returns:
+            tuple: (output, result) where output is the final output, the partial text produced
+            before the run was stopped, or None if nothing was produced.
+        """
+        result = Runner.run_streamed(agent, input, max_turns=self.max_turns, hooks=hooks)
+        try:
+            await asyncio.wait_for(self._drain(result), timeout=self.turn_deadline if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            result.cancel()
+            self.record("timed_out")
+            return ItemHelpers.text_message_outputs(result.new_items) or None, result
+        except MaxTurnsExceeded:
+            result.cancel()
+            self.record("max_turns_exceeded")
+            return ItemHelpers.text_message_outputs(result.new_items) or None, result
+
+        self.record("completed")
+        return result.final_output, result
+
+    async def _drain(self, result):
+        async for _ in result.stream_events():
+            pass
+
+
+supervisor = RunSupervisor(
+    turn_deadline=RUN_TURN_DEADLINE_SECONDS,
+    tool_deadline=TOOL_DEADLINE_SECONDS,
+    poll_interval=RUN_POLL_INTERVAL_SECONDS,
+    max_turns=AGENT_MAX_TURNS,
+    cancel_wait=RUN_CANCEL_WAIT_SECONDS
+)
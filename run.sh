@@ -5,4 +5,5 @@
 # source venv/bin/activate
 
 # Run the FastAPI app using uvicorn
+# (with SLACK_TRANSPORT=socket, events arrive over Socket Mode and the port only serves /debug)
 uvicorn main:fastapi_app --host 0.0.0.0 --port 16110 --reload
@@ -0,0 +1,38 @@
+import pytest
+
+from modules.utils import response_cache
+from modules.utils.response_cache import normalize_question
+
+
+@pytest.fixture(autouse=True)
+def today(monkeypatch):
+    # Tuesday
+    monkeypatch.setattr(response_cache, "get_today_date", lambda: "2025-06-10")
+
+
+def test_iso_and_day_month_dates_share_a_key():
+    iso = normalize_question("request từ 2025-05-01 đến 2025-05-07")
+    assert iso == "request tu 2025-05-01 den 2025-05-07"
+    assert normalize_question("Request từ 01/05/2025 đến 07/05/2025") == iso
+    assert normalize_question("request tu 1-5-2025 den 7-5-2025") == iso
+
+
+def test_day_month_without_year_uses_current_year():
+    assert normalize_question("số request ngày 15/5") == "so request ngay 2025-05-15"
+
+
+def test_invalid_day_month_is_kept():
+    assert normalize_question("số request ngày 31/02") == "so request ngay 31 02"
+
+
+def test_relative_dates_are_resolved():
+    assert normalize_question("Số request hôm nay?") == "so request 2025-06-10"
+    assert normalize_question("số request hôm qua") == "so request 2025-06-09"
+    assert normalize_question("requests yesterday") == "requests 2025-06-09"
+    assert normalize_question("task tuần này") == "task week 2025-06-09"
+    assert normalize_question("task tuần trước") == "task week 2025-06-02"
+    assert normalize_question("request tháng này") == "request month 2025-06"
+
+
+def test_case_diacritics_and_punctuation_are_ignored():
+    assert normalize_question("Task của tôi đang In Progress!!") == normalize_question("task cua toi dang in progress")